@@ -0,0 +1,276 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Offline benchmarks for ratebeer.
+
+Replays recorded pages and GraphQL responses from a local stand-in server
+(see ``server.py``), times the client calls and the parsers on their own,
+and writes the results as JSON::
+
+    $ python benchmarks/bench.py run --output results.json
+    $ python benchmarks/bench.py run --compare results.json
+    $ python benchmarks/bench.py record --synthetic
+
+``record`` makes every benchmarked request against the live site (or
+``--base-url``) and stores the responses in ``fixtures/``. The committed
+fixtures are synthetic: they are recorded with ``--synthetic`` from the
+generated site in ``synthetic.py``, which gives the same fixtures every time.
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import ratebeer
+from ratebeer import extract, models, soup, transport
+from ratebeer.ratebeer import RateBeer
+
+import server
+import synthetic
+
+BEER_URL = '/beer/deschutes-inversion-ipa/55610/'
+BREWERY_URL = '/brewers/deschutes-brewery/233/'
+BEER_IDS = [55610, 279122, 7344, 2531, 2205, 135361, 113241, 1088, 1698, 2360]
+STYLE_ID = 71
+SEARCH_QUERY = 'summit extra pale ale'
+
+# name: the client call to time.
+CLIENT_CASES = [
+    ('search', lambda rb: rb.search(SEARCH_QUERY)),
+    ('beer', lambda rb: rb.beer(BEER_URL)),
+    ('brewery', lambda rb: rb.brewery(BREWERY_URL)),
+    ('brewery_beers', lambda rb: list(rb.get_brewery(BREWERY_URL).get_beers())),
+    ('get_beers', lambda rb: list(rb.get_beers(BEER_IDS))),
+    ('get_reviews', lambda rb: list(rb.get_beer(BEER_URL, True).get_reviews())),
+    ('get_reviews_prefetch',
+     lambda rb: list(rb.get_beer(BEER_URL, True).get_reviews(prefetch=2))),
+    ('beer_style', lambda rb: list(rb.beer_style(STYLE_ID))),
+    ('beer_style_list', lambda rb: rb.beer_style_list()),
+]
+
+
+def _parse_cases(fixtures):
+    """Returns ``(name, callable)`` pairs that parse recorded pages without
+    any I/O."""
+    def page(path):
+        return fixtures.text('GET', path)
+
+    brewery = page(BREWERY_URL)
+    beers = page(models.Brewery(BREWERY_URL)._beers_url())
+    reviews = page(models.Beer(BEER_URL)._review_url(models.Beer._review_flag('most recent'), 1))
+    top = page('/top/')
+    beer = fixtures.text('POST', server.GRAPHQL_PATH,
+                         json.dumps(models.Beer(BEER_URL)._operations()))
+    return [
+        ('parse_brewery_soup',
+         lambda: models._brewery_record(BeautifulSoup(brewery, 'lxml'))),
+        ('parse_brewery_lxml', lambda: extract.brewery(brewery)),
+        ('parse_brewery_beers_soup',
+         lambda: models._beer_rows(BeautifulSoup(beers, 'lxml', parse_only=models._BEER_TABLE_ONLY))),
+        ('parse_brewery_beers_lxml', lambda: extract.brewery_beers(beers)),
+        ('parse_reviews',
+         lambda: models._parse_reviews(BeautifulSoup(reviews, 'lxml', parse_only=models._REVIEWS_ONLY))),
+        ('parse_style_list_lxml', lambda: extract.style_list(top)),
+        ('parse_beer_json', lambda: models.Beer(BEER_URL)._apply(json.loads(beer))),
+    ]
+
+
+@contextlib.contextmanager
+def _pointed_at(base_url):
+    """Sends every request to ``base_url`` instead of RateBeer.com, if
+    given."""
+    if base_url is None:
+        yield
+        return
+    saved = soup._BASE_URL, transport._GRAPHQL_URL
+    soup._BASE_URL = base_url
+    transport._GRAPHQL_URL = base_url + server.GRAPHQL_PATH
+    try:
+        yield
+    finally:
+        soup._BASE_URL, transport._GRAPHQL_URL = saved
+
+
+def _summary(kind, timings):
+    timings = sorted(timings)
+    total = sum(timings)
+
+    def percentile(p):
+        return timings[min(len(timings) - 1, int(p * len(timings)))]
+
+    return {'kind': kind,
+            'iterations': len(timings),
+            'mean': total / len(timings),
+            'min': timings[0],
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'max': timings[-1],
+            'ops_per_sec': len(timings) / total if total else None}
+
+
+def _time(call, iterations):
+    call()  # Warm up.
+    timings = []
+    for _ in range(iterations):
+        start = time.time()
+        call()
+        timings.append(time.time() - start)
+    return timings
+
+
+def run(iterations=None, latency=None, parser=None, only=None):
+    """Runs the benchmarks against the stand-in and returns the results.
+
+    Args:
+        iterations (int): timed calls per benchmark (default: 20).
+        latency (float): seconds the stand-in waits before every response
+            (default: 0).
+        parser (string): the ``Transport`` parser, "soup" or "lxml".
+        only (list): names of the benchmarks to run (default: all).
+    """
+    if iterations is None:
+        iterations = 20
+    fixtures = server.Fixtures()
+    results = {}
+    with server.StandIn(fixtures, latency) as stand_in, _pointed_at(stand_in.url):
+        for name, case in CLIENT_CASES:
+            if only and name not in only:
+                continue
+            with RateBeer(transport.Transport(parser=parser)) as rb:
+                results[name] = _summary('client', _time(lambda: case(rb), iterations))
+        for name, case in _parse_cases(fixtures):
+            if only and name not in only:
+                continue
+            results[name] = _summary('parse', _time(case, iterations))
+    return {'meta': {'ratebeer': ratebeer.__version__,
+                     'python': platform.python_version(),
+                     'platform': platform.platform(),
+                     'time': datetime.datetime.utcnow().isoformat() + 'Z',
+                     'iterations': iterations,
+                     'latency': latency or 0,
+                     'parser': parser or 'soup',
+                     'unmatched_requests': len(stand_in.misses)},
+            'results': results}
+
+
+def compare(results, baseline, tolerance):
+    """Returns the benchmarks whose median got more than ``tolerance``
+    (a fraction) slower than in ``baseline``, as ``(name, old, new)``."""
+    slower = []
+    for name, new in sorted(results['results'].items()):
+        old = baseline['results'].get(name)
+        if old and new['p50'] > old['p50'] * (1 + tolerance):
+            slower.append((name, old['p50'], new['p50']))
+    return slower
+
+
+class _RecordingTransport(transport.Transport):
+    """A Transport that stores every response it receives as a fixture."""
+
+    def __init__(self, fixtures, **kwargs):
+        transport.Transport.__init__(self, **kwargs)
+        self.fixtures = fixtures
+
+    def _send(self, method, url, endpoint, **kwargs):
+        req = transport.Transport._send(self, method, url, endpoint, **kwargs)
+        path = req.request.path_url
+        if url.startswith(transport._GRAPHQL_URL):
+            path = server.GRAPHQL_PATH
+        self.fixtures.add(method, path, kwargs.get('data'), req.status_code,
+                          req.headers.get('Content-Type'), req.content)
+        return req
+
+
+def record(base_url=None):
+    """Runs every client benchmark once, recording the responses."""
+    fixtures = server.Fixtures()
+    with _pointed_at(base_url), RateBeer(_RecordingTransport(fixtures)) as rb:
+        for name, case in CLIENT_CASES:
+            case(rb)
+    fixtures.save()
+    return len(fixtures.index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--iterations', type=int)
+    run_parser.add_argument('--latency', type=float,
+                            help='seconds of simulated network latency per response')
+    run_parser.add_argument('--parser', choices=['soup', 'lxml'])
+    run_parser.add_argument('--only', nargs='+', help='benchmark names to run')
+    run_parser.add_argument('--output', help='write the JSON results here')
+    run_parser.add_argument('--compare', help='JSON results of an earlier run')
+    run_parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='allowed slowdown of the median (default: 0.25)')
+    record_parser = commands.add_parser('record', help='record fixtures')
+    record_parser.add_argument('--base-url', help='record from here instead of RateBeer.com')
+    record_parser.add_argument('--synthetic', action='store_true',
+                               help='record from the generated site in synthetic.py')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        if args.synthetic:
+            with synthetic.Site() as site:
+                recorded = record(site.url)
+        else:
+            recorded = record(args.base_url)
+        print('{0} responses recorded'.format(recorded))
+        return 0
+    if args.command != 'run':
+        parser.print_help()
+        return 2
+
+    results = run(args.iterations, args.latency, args.parser, args.only)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    if results['meta']['unmatched_requests']:
+        sys.stderr.write('{0} requests had no fixture; run `record` again.\n'.format(
+            results['meta']['unmatched_requests']))
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(results, json.load(f), args.tolerance)
+        for name, old, new in slower:
+            sys.stderr.write('{0}: median {1:.4f}s -> {2:.4f}s\n'.format(name, old, new))
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
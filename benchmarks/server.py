@@ -0,0 +1,189 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Local stand-in for RateBeer.com that replays recorded responses.
+
+Fixtures live in ``fixtures/``: one file per response body, and
+``index.json`` describing which request each one answers. Requests are
+matched on method, path and (for POSTs) the JSON-normalised body, so a
+benchmark has to make exactly the requests that were recorded.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+GRAPHQL_PATH = '/v1/api/graphql/'
+
+_NOT_FOUND = b'<html><body>ratebeer robot oops</body></html>'
+
+
+def fixture_key(method, path, body=None):
+    """Returns the name a response is stored and looked up under."""
+    raw = u'{0} {1} {2}'.format(method, path, _normalise(body))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _normalise(body):
+    if not body:
+        return ''
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    try:
+        return json.dumps(json.loads(body), sort_keys=True)
+    except ValueError:
+        return body
+
+
+class Fixtures(object):
+    """The recorded responses in a fixtures directory.
+
+    Args:
+        path (string): the directory (default: ``fixtures/`` next to this
+            file).
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = FIXTURES
+        self.path = path
+        index = os.path.join(path, 'index.json')
+        self.index = {}
+        if os.path.exists(index):
+            with open(index) as f:
+                self.index = json.load(f)
+
+    def get(self, method, path, body=None):
+        """Returns ``(status, content type, body bytes)``, or None."""
+        entry = self.index.get(fixture_key(method, path, body))
+        if entry is None:
+            return None
+        with open(os.path.join(self.path, entry['file']), 'rb') as f:
+            return entry['status'], entry['content_type'], f.read()
+
+    def text(self, method, path, body=None):
+        """Returns a recorded body decoded as the client would see it."""
+        status, content_type, content = self.get(method, path, body)
+        return content.decode('utf-8', 'replace')
+
+    def add(self, method, path, body, status, content_type, content):
+        """Stores a response, replacing any earlier recording of it."""
+        key = fixture_key(method, path, body)
+        extension = '.json' if 'json' in (content_type or '') else '.html'
+        with open(os.path.join(self.path, key + extension), 'wb') as f:
+            f.write(content)
+        self.index[key] = {'method': method, 'path': path, 'status': status,
+                           'content_type': content_type, 'file': key + extension}
+
+    def save(self):
+        with open(os.path.join(self.path, 'index.json'), 'w') as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StandIn(object):
+    """Serves ``fixtures`` on a local port, from a background thread.
+
+    Args:
+        fixtures (Fixtures): the responses to replay.
+        latency (float): seconds to wait before every response, to mimic the
+            round trip to the real site (default: 0).
+    """
+
+    def __init__(self, fixtures=None, latency=None):
+        if fixtures is None:
+            fixtures = Fixtures()
+        if latency is None:
+            latency = 0
+        self.fixtures = fixtures
+        self.latency = latency
+        self.requests = 0
+        self.misses = []
+        self._server = _ThreadingServer(('127.0.0.1', 0), _handler(self))
+        self.url = 'http://127.0.0.1:{0}'.format(self._server.server_address[1])
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def _handler(stand_in):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately; don't let Nagle's
+        # algorithm hold the body back for a delayed ACK.
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self._replay(None)
+
+        def do_POST(self):
+            self._replay(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+
+        def _replay(self, body):
+            stand_in.requests += 1
+            if stand_in.latency:
+                time.sleep(stand_in.latency)
+            found = stand_in.fixtures.get(self.command, self.path, body)
+            if found is None:
+                stand_in.misses.append((self.command, self.path))
+                found = 404, 'text/html', _NOT_FOUND
+            status, content_type, content = found
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    return Handler
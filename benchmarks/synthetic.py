@@ -0,0 +1,348 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Synthetic stand-in for RateBeer.com that the benchmark fixtures are
+generated from.
+
+The committed fixtures are not recordings of the live site: they are what
+``bench.py record --synthetic`` records from this server. Every page is built
+from a ``random.Random`` seeded with its path, so generating the fixtures
+again gives the same bytes. Pages follow the site's markup and are about as
+large as the real ones: full page chrome around each page, several hundred
+beers in a brewery's beer table, and ten reviews of a few hundred words per
+review page.
+"""
+
+import json
+import random
+import re
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import unquote
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler
+    from urllib import unquote
+
+import server
+
+REVIEWS_PER_PAGE = 10
+
+_STYLES = [
+    u'Abbey Dubbel', u'Abbey Tripel', u'Abt/Quadrupel', u'Altbier', u'Amber Ale',
+    u'American Pale Ale', u'American Strong Ale', u'Baltic Porter', u'Barley Wine',
+    u'Belgian Ale', u'Belgian Strong Ale', u'Berliner Weisse', u'Bitter',
+    u'Black IPA', u'Bohemian Pilsener', u'Brown Ale', u'California Common',
+    u'Cider', u'Cream Ale', u'Doppelbock', u'Dortmunder/Helles', u'Dry Stout',
+    u'Dunkel', u'Dunkelweizen', u'Eisbock', u'English Strong Ale', u'Foreign Stout',
+    u'Fruit Beer', u'German Hefeweizen', u'German Kristallweizen', u'Golden Ale',
+    u'Gose', u'Grodziskie', u'Heller Bock', u'Imperial IPA', u'Imperial Pils',
+    u'Imperial Porter', u'Imperial Stout', u'India Pale Ale (IPA)', u'Irish Ale',
+    u'Kölsch', u'Lambic - Faro', u'Lambic - Fruit', u'Lambic - Gueuze',
+    u'Malt Liquor', u'Mead', u'Mild Ale', u'Oktoberfest/Märzen', u'Old Ale',
+    u'Pale Lager', u'Pilsener', u'Porter', u'Premium Bitter/ESB', u'Premium Lager',
+    u'Radler/Shandy', u'Rauchbier', u'Saison', u'Schwarzbier', u'Scotch Ale',
+    u'Scottish Ale', u'Session IPA', u'Smoked', u'Sour Red/Brown', u'Spice/Herb',
+    u'Stout', u'Sweet Stout', u'Traditional Ale', u'Vienna', u'Weizen Bock',
+    u'Wheat Ale', u'Wild Ale', u'Witbier', u'Zwickel/Keller/Landbier',
+]
+_ADJECTIVES = [
+    u'Black', u'Golden', u'Hazy', u'Old', u'Dark', u'Red', u'Wild', u'Mirror',
+    u'Twilight', u'Fresh', u'Jubel', u'Obsidian', u'Frost', u'Abyss', u'Chainbreaker',
+    u'Hop', u'River', u'Mountain', u'Mælk', u'Brüt', u'Café', u'Nitro', u'Barrel',
+]
+_NOUNS = [
+    u'Butte', u'Pond', u'Trail', u'Inversion', u'Fresh Squeezed', u'Porter',
+    u'Sunset', u'Harvest', u'Reserve', u'Hammer', u'Lantern', u'Crest', u'Stone',
+    u'Ridge', u'Haze', u'Bloom', u'Dream', u'Pilsner', u'Ale', u'Tripel',
+]
+_WORDS = (u'pours a hazy amber with a thick off-white head that leaves good lacing '
+          u'aroma of pine resin grapefruit caramel malt biscuit and a touch of '
+          u'brown sugar taste follows the nose with a firm bitterness medium body '
+          u'moderate carbonation and a dry lingering finish really well balanced '
+          u'would happily drink this again bottle from the local shop served in a '
+          u'tulip glass notes of toffee roasted coffee dark chocolate and dried '
+          u'fruit the alcohol is well hidden crisp clean and refreshing slightly '
+          u'sweet earthy hops citrus peel bready malt backbone').split()
+_CITIES = [
+    (u'Portland', u'Oregon'), (u'Bend', u'Oregon'), (u'Denver', u'Colorado'),
+    (u'Oslo', u'NORWAY'), (u'København', u'DENMARK'), (u'München', u'GERMANY'),
+    (u'Brussels', u'BELGIUM'), (u'Toronto', u'Ontario'), (u'Leeds', u'ENGLAND'),
+    (u'São Paulo', u'BRAZIL'), (u'Melbourne', u'Victoria'), (u'Kraków', u'POLAND'),
+]
+_MONTHS = [u'Jan', u'Feb', u'Mar', u'Apr', u'May', u'Jun',
+           u'Jul', u'Aug', u'Sep', u'Oct', u'Nov', u'Dec']
+
+
+def _slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def _sentence(rng, low, high):
+    return u' '.join(rng.choice(_WORDS) for _ in range(rng.randint(low, high))).capitalize() + u'.'
+
+
+def _paragraph(rng, sentences):
+    return u' '.join(_sentence(rng, 8, 20) for _ in range(sentences))
+
+
+def _beer_name(rng):
+    return u'{0} {1}'.format(rng.choice(_ADJECTIVES), rng.choice(_NOUNS))
+
+
+def _page(title, body):
+    """Wraps ``body`` in the site's page chrome: stylesheets, scripts,
+    navigation, footer and the inline state blob."""
+    rng = random.Random(u'chrome')
+    head = u''.join(
+        u'<link rel="stylesheet" href="/css/bundle-{0:04x}.css" />'
+        u'<script src="/js/chunk-{0:04x}.js" async></script>'.format(i) for i in range(40))
+    menu = u''.join(
+        u'<li class="nav-item"><a class="nav-link" href="/beerstyles/{0}/{1}/">{2}</a></li>'.format(
+            _slug(style), i, style) for i, style in enumerate(_STYLES))
+    footer = u''.join(
+        u'<li><a href="/places/{0}/">{1}, {2}</a></li>'.format(i, city, region)
+        for i, (city, region) in enumerate(_CITIES * 8))
+    state = json.dumps({'strings': dict((u'key{0}'.format(i), _sentence(rng, 4, 12))
+                                        for i in range(300))})
+    return (u'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8" />'
+            u'<title>{0} - RateBeer</title>{1}</head><body>'
+            u'<nav class="navbar"><ul class="navbar-nav">{2}</ul></nav>'
+            u'<main class="container">{3}</main>'
+            u'<footer><ul class="footer-links">{4}</ul></footer>'
+            u'<script>window.__STATE__ = {5};</script></body></html>').format(
+                title, head, menu, body, footer, state)
+
+
+def brewery(brewery_id):
+    rng = random.Random(u'brewery:{0}'.format(brewery_id))
+    name = u'{0} Brewery'.format(rng.choice(_ADJECTIVES))
+    city, region = rng.choice(_CITIES[:3])
+    body = (u'<h1>{0}</h1>'
+            u'<div itemscope itemtype="http://schema.org/LocalBusiness">'
+            u'<div class="brewer-image"><img src="/img/brewers/{1}.jpg" /></div>'
+            u'<div> Microbrewery </div>'
+            u'<div class="media-links"><a href="http://www.{2}.example/">website</a>'
+            u'<a href="https://twitter.example/{2}">twitter</a></div>'
+            u'<div class="address"><span itemprop="streetAddress">{3} SW Simpson Ave</span>, '
+            u'<span itemprop="addressLocality">{4}</span>, '
+            u'<span itemprop="addressRegion">{5}</span> '
+            u'<span itemprop="postalCode">{6}</span> '
+            u'<span itemprop="addressCountry">USA</span><br />'
+            u'<span itemprop="telephone">541-385-{7}</span></div></div>'
+            u'<div class="description"><p>{8}</p></div>').format(
+                name, brewery_id, _slug(name), rng.randint(100, 999), city, region,
+                rng.randint(10000, 99999), rng.randint(1000, 9999), _paragraph(rng, 12))
+    return _page(name, body)
+
+
+def brewery_beers(brewery_id):
+    """The brewery's beer table: a few hundred beers, some of them
+    unratable or listed without an ABV or ratings."""
+    rng = random.Random(u'beers:{0}'.format(brewery_id))
+    rows = [u'<tr><th>Name</th><th>ABV</th><th>Added</th><th></th><th>Avg</th>'
+            u'<th>Style %</th><th>Ratings</th></tr>']
+    for i in range(rng.randint(350, 450)):
+        beer_id = brewery_id * 1000 + i
+        name = _beer_name(rng)
+        ratable = rng.random() > 0.05
+        rated = rng.random() > 0.15
+        rows.append(
+            u'<tr><td><strong><a href="/beer/{0}/{1}/">{2}</a></strong><br />'
+            u'<span class="small text-muted">{3}</span>{4}</td>'
+            u'<td>{5}</td><td><span class="small">{6} {7}</span></td><td></td>'
+            u'<td> {8} </td><td> {9} </td><td> {10} </td></tr>'.format(
+                _slug(name), beer_id, name, rng.choice(_STYLES),
+                u' <a title="Rate this beer" href="/rate/{0}/"><i class="fa fa-star"></i></a>'.format(
+                    beer_id) if ratable else u'',
+                u'{0:.1f}'.format(rng.uniform(3.5, 12)) if rng.random() > 0.1 else u'-',
+                rng.choice(_MONTHS), rng.randint(1998, 2019),
+                u'{0:.2f}'.format(rng.uniform(2.5, 4.3)) if rated else u'',
+                rng.randint(1, 100) if rated else u'',
+                rng.randint(1, 4000) if rated else u''))
+    body = u'<table id="brewer-beer-table" class="table">{0}</table>'.format(u''.join(rows))
+    return _page(u'Beers', body)
+
+
+def reviews(beer_id, page_number):
+    """A page of reviews. Every beer has between two and four pages."""
+    total = random.Random(u'reviews:{0}'.format(beer_id)).randint(2 * REVIEWS_PER_PAGE,
+                                                                 4 * REVIEWS_PER_PAGE)
+    rng = random.Random(u'reviews:{0}:{1}'.format(beer_id, page_number))
+    first = (page_number - 1) * REVIEWS_PER_PAGE
+    items = []
+    for i in range(first, min(total, first + REVIEWS_PER_PAGE)):
+        scores = [rng.randint(4, 10), rng.randint(2, 5), rng.randint(4, 10),
+                  rng.randint(2, 5), rng.randint(8, 20)]
+        city, region = rng.choice(_CITIES)
+        items.append(
+            u'<div style="padding: 0px 0px 0px 0px;"><div class="avatar"><img src="/img/u/{0}.jpg" /></div>'
+            u'<div title="<small>Aroma {1}/10<br />Appearance {2}/5<br />Taste {3}/10<br />'
+            u'Palate {4}/5<br />Overall {5}/20<br /></small>">{6:.1f}</div></div>'
+            u'<small><a href="/user/{0}/">reviewer{0}\xa0({7})</a> - {8}, {9} - {10} {11:02d}, {12}</small>'
+            u'<br /><div class="review-text">{13}</div>'.format(
+                rng.randint(1000, 500000), scores[0], scores[1], scores[2], scores[3],
+                scores[4], sum(scores) / 10.0, rng.randint(1, 9000), city, region,
+                rng.choice(_MONTHS), rng.randint(1, 28), rng.randint(2005, 2019),
+                _paragraph(rng, rng.randint(3, 8))))
+    body = u'<div class="reviews-container">{0}</div>'.format(u''.join(items))
+    return _page(u'Reviews', body)
+
+
+def style_list():
+    options = u''.join(u'<option name="{0}" value="{1}">{2}</option>'.format(i + 1, 40 + i, style)
+                       for i, style in enumerate(_STYLES))
+    body = (u'<select id="StyleMenu" class="form-control">'
+            u'<option value="">Choose a style</option>{0}</select>').format(options)
+    return _page(u'Top Beers', body)
+
+
+def top_beer(style_id):
+    """The ajax table of a style's top 50 beers. Served without page chrome,
+    as on the site."""
+    rng = random.Random(u'top:{0}'.format(style_id))
+    rows = [u'<tr><th>#</th><th>Name</th><th></th><th>Score</th><th>Count</th></tr>']
+    for i in range(50):
+        name = _beer_name(rng)
+        rows.append(u'<tr><td>{0}</td><td><a href="/beer/{1}/{2}/">{3}</a>'
+                    u'<br /><span class="small">{4} Brewery</span></td><td></td>'
+                    u'<td>{5:.2f}</td><td>{6}</td></tr>'.format(
+                        i + 1, _slug(name), rng.randint(1000, 900000), name,
+                        rng.choice(_ADJECTIVES), rng.uniform(3.5, 4.5), rng.randint(50, 5000)))
+    return u'<table class="table">{0}</table>'.format(u''.join(rows))
+
+
+def beer_info(beer_id):
+    rng = random.Random(u'beer:{0}'.format(beer_id))
+    return {'id': str(beer_id), 'name': _beer_name(rng),
+            'description': _paragraph(rng, 6),
+            'style': {'id': str(rng.randint(1, 120)), 'name': rng.choice(_STYLES),
+                      'glasses': [{'id': '1', 'name': 'Tulip', '__typename': 'Glass'}],
+                      '__typename': 'Style'},
+            'styleScore': rng.randint(1, 100), 'overallScore': rng.randint(1, 100),
+            'averageRating': round(rng.uniform(2.5, 4.3), 2),
+            'abv': round(rng.uniform(3.5, 12), 1), 'ibu': rng.randint(10, 100),
+            'calories': rng.randint(100, 350),
+            'brewer': {'id': '233', 'name': 'Deschutes Brewery', '__typename': 'Brewer'},
+            'ratingCount': rng.randint(1, 4000), 'isRetired': False, 'isUnrateable': False,
+            'seasonal': 'UNKNOWN', 'labels': [],
+            'availability': {'bottle': 'AVAILABLE', 'tap': 'AVAILABLE',
+                             'distribution': 'NATIONAL', '__typename': 'Availability'},
+            '__typename': 'Beer'}
+
+
+def graphql(operation):
+    """Answers one GraphQL operation the client sends."""
+    name = operation.get('operationName')
+    variables = operation.get('variables', {})
+    if name == 'beer':
+        return {'data': {'info': beer_info(variables['beerId'])}}
+    if name == 'beerByAlias':
+        return {'data': {'beerByAlias': None}}
+    if name == 'tagDisplay':
+        rng = random.Random(u'tags:{0}'.format(variables['beerId']))
+        return {'data': {'tagDisplayArr': {'items': [
+            {'id': rng.randint(1, 5000), 'urlName': rng.choice(_WORDS), '__typename': 'Tag'}
+            for _ in range(8)], '__typename': 'TagList'}}}
+    if name == 'beerSearch':
+        rng = random.Random(u'search:{0}'.format(variables['query']))
+        items = [{'beer': {'id': str(rng.randint(1000, 900000)), 'name': _beer_name(rng),
+                           'imageUrl': 'https://res.cloudinary.example/beer_{0}.jpg'.format(i),
+                           'overallScore': rng.randint(1, 100),
+                           'ratingCount': rng.randint(0, 4000), '__typename': 'Beer'},
+                  'review': None, '__typename': 'BeerSearchResult'}
+                 for i in range(variables.get('first', 20))]
+        return {'data': {'searchResultsArr': {'totalCount': 140, 'last': str(len(items)),
+                                              'items': items, '__typename': 'SearchResults'}}}
+    return {'errors': [{'message': 'Unknown operation {0}'.format(name)}]}
+
+
+def respond(method, path, body=None):
+    """Returns ``(status, content type, text)`` for a request to the site."""
+    path = unquote(path)
+    if method == 'POST' and path == server.GRAPHQL_PATH:
+        payload = json.loads(body.decode('utf-8'))
+        if isinstance(payload, list):
+            answer = [graphql(operation) for operation in payload]
+        else:
+            answer = graphql(payload)
+        return 200, 'application/json', json.dumps(answer)
+    html = 'text/html; charset=utf-8'
+    match = re.match(r'^/brewers/[^/]+/(\d+)/$', path)
+    if match:
+        return 200, html, brewery(int(match.group(1)))
+    match = re.match(r'^/Ratings/Beer/ShowBrewerBeers\.asp\?BrewerID=(\d+)$', path)
+    if match:
+        return 200, html, brewery_beers(int(match.group(1)))
+    match = re.match(r'^/beer/[^/]+/(\d+)/\d/(\d+)/$', path)
+    if match:
+        return 200, html, reviews(int(match.group(1)), int(match.group(2)))
+    if path == '/top/':
+        return 200, html, style_list()
+    match = re.match(r'^/ajax/top-beer\.asp\?s=(\d+)', path)
+    if match:
+        return 200, html, top_beer(int(match.group(1)))
+    return 404, 'text/html', server._NOT_FOUND.decode('utf-8')
+
+
+class Site(object):
+    """Serves the synthetic site on a local port, from a background thread."""
+
+    def __init__(self):
+        self._server = server._ThreadingServer(('127.0.0.1', 0), _Handler)
+        self.url = 'http://127.0.0.1:{0}'.format(self._server.server_address[1])
+
+    def __enter__(self):
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._respond(None)
+
+    def do_POST(self):
+        self._respond(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+
+    def _respond(self, body):
+        status, content_type, text = respond(self.command, self.path, body)
+        content = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
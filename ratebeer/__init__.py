@@ -27,5 +27,6 @@
 
 from ._version import __version__
 from .ratebeer import RateBeer
+from .transport import Transport
 
-__all__ = [RateBeer]
+__all__ = [RateBeer, Transport]
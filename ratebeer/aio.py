@@ -0,0 +1,540 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Asyncio counterpart of ``RateBeer``, built on aiohttp.
+
+Requires Python 3 and aiohttp (``pip install ratebeer[async]``)::
+
+    >>> from ratebeer.aio import AsyncRateBeer
+    >>> async with AsyncRateBeer(concurrency=50) as rb:
+    ...     beers = await asyncio.gather(*[rb.beer(url) for url in urls])
+"""
+
+import asyncio
+import collections
+import json
+import string
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from ratebeer import cache as cache_helper
+from ratebeer import extract
+from ratebeer import models
+from ratebeer import rb_exceptions
+from ratebeer import soup as soup_helper
+from ratebeer import stats as stats_helper
+from ratebeer import transport as transport_helper
+from ratebeer.ratebeer import RateBeer, _STYLE_MENU_ONLY, _STYLE_SORTS, _TABLE_ONLY, _hydrated
+
+
+class AsyncTransport(object):
+    """Pooled aiohttp transport with a bound on in-flight requests.
+
+    Args:
+        concurrency (int): the maximum number of requests in flight at once,
+            enforced with ``semaphore`` (default: 100).
+        limit (int): the maximum number of open connections (default: the
+            same as ``concurrency``).
+        limit_per_host (int): the maximum number of open connections to a
+            single host (default: 0, no per-host limit).
+        timeout (float): total seconds allowed per request (default: None,
+            wait forever).
+        headers (dict): extra headers sent with every request.
+        cache (BaseCache): where to keep responses (default: None). Keys are
+            shared with ``Transport``, so both can use the same cache.
+        parser (string): "soup" (default) or "lxml". See ``Transport``.
+        throttle (Throttle): rate limit and retry policy for every request
+            (default: None). See ``Transport``.
+        stats (Stats): where to record metrics (default: None). See
+            ``Transport``.
+    """
+
+    def __init__(self, concurrency=None, limit=None, limit_per_host=None,
+                 timeout=None, headers=None, cache=None, parser=None,
+                 throttle=None, stats=None):
+        if aiohttp is None:
+            raise ImportError("AsyncTransport requires aiohttp. "
+                              "Install it with `pip install ratebeer[async]`.")
+        if concurrency is None:
+            concurrency = 100
+        if limit is None:
+            limit = concurrency
+        if limit_per_host is None:
+            limit_per_host = 0
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.headers = headers
+        if parser is None:
+            parser = 'soup'
+        self.cache = cache
+        self.parser = parser
+        self.throttle = throttle
+        self.stats = stats
+        self._session = None
+        self.identities = None
+
+    def _get_session(self):
+        # The session has to be created inside the running event loop.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers)
+        return self._session
+
+    async def get(self, url, **kwargs):
+        """Sends a GET request and returns the decoded response body."""
+        return await self._request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        """Sends a POST request and returns the decoded response body."""
+        return await self._request('POST', url, **kwargs)
+
+    async def _request(self, method, url, endpoint=None, **kwargs):
+        endpoint = endpoint or cache_helper._endpoint(url)
+        if self.cache is None:
+            return (await self._send(method, url, endpoint, **kwargs))[1]
+        if method == 'GET':
+            return await self._get_page(url, endpoint, **kwargs)
+
+        key = cache_helper._key(method, url, kwargs.get('data'))
+        text = self.cache.get(key)
+        if text is None:
+            self._count_cache(endpoint, 'miss')
+            response, text = await self._send(method, url, endpoint, **kwargs)
+            if response.status == 200:
+                self.cache.set(key, text, self.cache.ttl_for(endpoint))
+        else:
+            self._count_cache(endpoint, 'hit')
+        return text
+
+    async def _get_page(self, url, endpoint, **kwargs):
+        # Same storage and revalidation as ``Transport.get_text``.
+        key = cache_helper._key('GET', url)
+        page = cache_helper._load_page(self.cache.get(key))
+        if cache_helper._is_fresh(page):
+            self._count_cache(endpoint, 'hit')
+            return page['text']
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        headers.update(cache_helper._conditional_headers(page))
+        response, text = await self._send('GET', url, endpoint, headers=headers, **kwargs)
+        if response.status == 304 and page is not None:
+            self._count_cache(endpoint, 'revalidated')
+            text = page['text']
+            etag = response.headers.get('ETag') or page.get('etag')
+            last_modified = response.headers.get('Last-Modified') or page.get('last_modified')
+        elif response.status == 200:
+            self._count_cache(endpoint, 'miss')
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+        else:
+            return text
+        cache_helper._store_page(self.cache, key, text, etag, last_modified, endpoint)
+        return text
+
+    def _count_cache(self, endpoint, result):
+        if self.stats is not None:
+            self.stats._cache(endpoint, result)
+
+    async def _send(self, method, url, endpoint=None, **kwargs):
+        if self.throttle is None:
+            return await self._send_once(method, url, endpoint, **kwargs)
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.throttle._reserve())
+            try:
+                response, text = await self._send_once(method, url, endpoint, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                delay = self.throttle._retry_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                delay = self.throttle._retry_delay(attempt, response.status, response.headers)
+                if delay is None:
+                    return response, text
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send_once(self, method, url, endpoint, **kwargs):
+        async with self.semaphore:
+            start = stats_helper._clock()
+            try:
+                async with self._get_session().request(method, url, **kwargs) as response:
+                    body = await response.read()
+            except Exception:
+                if self.stats is not None:
+                    self.stats._request(endpoint, method, 'error',
+                                        stats_helper._clock() - start, 0)
+                raise
+            if self.stats is not None:
+                self.stats._request(endpoint, method, response.status,
+                                    stats_helper._clock() - start, len(body))
+            if response.content_type == 'application/json':
+                text = body.decode(response.charset or 'utf-8', 'replace')
+            else:
+                text = transport_helper._decode(body, response.charset)
+            return response, text
+
+    async def close(self):
+        """Closes every pooled connection."""
+        if self._session is not None:
+            await self._session.close()
+
+
+async def _get_soup(url, transport, parse_only=None):
+    url = soup_helper._strip_base(url)
+    text = await transport.get(soup_helper._BASE_URL + url)
+    with soup_helper._timed_parse(transport, url, 'soup'):
+        return soup_helper._make_soup(text, url, parse_only)
+
+
+async def _get_record(url, transport, from_soup, from_text, parse_only=None):
+    # See ``soup._get_record``.
+    if transport.parser != 'lxml':
+        return from_soup(await _get_soup(url, transport, parse_only))
+    url = soup_helper._strip_base(url)
+    text = await transport.get(soup_helper._BASE_URL + url)
+    with soup_helper._timed_parse(transport, url, 'lxml'):
+        soup_helper._check_found(text, url)
+        return from_text(text)
+
+
+async def _post_graphql(transport, data, ident):
+    text = await transport.post(transport_helper._GRAPHQL_URL,
+                                data=json.dumps(data),
+                                headers={"content-type": "application/json"},
+                                endpoint=transport_helper._operation_name(data))
+    try:
+        return json.loads(text)
+    except ValueError:
+        raise rb_exceptions.JSONParseException(ident)
+
+
+class AsyncBeer(models.Beer):
+    """A Beer fetched through an ``AsyncTransport``.
+
+    Attributes are not fetched lazily; ``await beer._populate()`` before
+    reading anything the listing it came from did not provide.
+    """
+
+    __slots__ = ()
+
+    __getattr__ = models._Record.__getattr__
+
+    async def _populate(self, fields=None):
+        with stats_helper._timed(self._transport.stats, 'populate_seconds', 'beer'):
+            results = await _post_graphql(self._transport, self._operations(fields), self.id)
+            return self._apply(results, fields)
+
+    async def get_reviews(self, review_order="most recent", prefetch=None):
+        """Async generator of Review objects. See ``Beer.get_reviews``."""
+        if not self._has_fetched and getattr(self, '_fields', None) is None:
+            await self._populate()
+
+        url_flag = models.Beer._review_flag(review_order)
+        if not prefetch:
+            prefetch = 0
+        page_number = 1
+        pending = collections.deque()
+        try:
+            while True:
+                while len(pending) < prefetch + 1:
+                    pending.append(asyncio.ensure_future(self._review_page(url_flag, page_number)))
+                    page_number += 1
+                reviews = await pending.popleft()
+                if len(reviews) < 1:
+                    return
+
+                for review in reviews:
+                    yield review
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _review_page(self, url_flag, page_number):
+        soup = await _get_soup(self._review_url(url_flag, page_number), self._transport,
+                               models._REVIEWS_ONLY)
+        return models._parse_reviews(soup)
+
+    def _new_brewery(self, url):
+        return models._shared(AsyncBrewery, url, self._transport)
+
+
+class AsyncBrewery(models.Brewery):
+    """A Brewery fetched through an ``AsyncTransport``.
+
+    Like ``AsyncBeer``, call ``await brewery._populate()`` before reading
+    attributes that were not already set.
+    """
+
+    __slots__ = ()
+
+    __getattr__ = models._Record.__getattr__
+
+    async def _populate(self):
+        with stats_helper._timed(self._transport.stats, 'populate_seconds', 'brewery'):
+            record = await _get_record(self.url, self._transport,
+                                       models._brewery_record, extract.brewery)
+            return self._apply(record)
+
+    async def get_beers(self):
+        """Async generator of AsyncBeer objects for the brewery's beers."""
+        if not self._has_fetched:
+            await self._populate()
+
+        rows = await _get_record(self._beers_url(), self._transport,
+                                 models._beer_rows, extract.brewery_beers,
+                                 models._BEER_TABLE_ONLY)
+        for beer in self._beers_from_rows(rows):
+            yield beer
+
+    def _new_beer(self, url):
+        return models._shared(AsyncBeer, url, self._transport)
+
+
+class AsyncRateBeer(RateBeer):
+    """Asyncio RateBeer.com scraper. Every method is a coroutine (or, for
+    ``beer_style``, an async generator) with the same arguments and results
+    as its ``RateBeer`` counterpart.
+
+    Args:
+        transport (AsyncTransport): the transport to fetch through.
+        concurrency (int): the maximum number of requests in flight when a
+            new transport is created (default: 100). Ignored if
+            ``transport`` is provided.
+        identity_map (bool or IdentityMap): share one object per beer and
+            brewery. See ``RateBeer``.
+    """
+
+    _beer_class = AsyncBeer
+    _brewery_class = AsyncBrewery
+
+    def __init__(self, transport=None, concurrency=None, identity_map=None):
+        if transport is None:
+            transport = AsyncTransport(concurrency=concurrency)
+        self.transport = transport
+        self._set_identity_map(identity_map)
+
+    def __enter__(self):
+        raise TypeError("Use `async with` with AsyncRateBeer.")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """Closes the client's pooled connections."""
+        await self.transport.close()
+
+    async def search(self, query):
+        results = await _post_graphql(self.transport, self._search_operation(query), query)
+        return self._parse_search(results)
+
+    async def iter_search(self, query, page_size=None, max_results=None, prefetch=None):
+        """Async generator of every beer matching the search query. See
+        ``RateBeer.iter_search``."""
+        if page_size is None:
+            page_size = 20
+        upcoming = None
+        try:
+            count = 0
+            first = self._page_size(page_size, max_results, 0)
+            if not first:
+                return
+            page = await self._search_page(query, first)
+            while True:
+                beers, after = page
+                beers = beers[:None if max_results is None else max_results - count]
+                remaining = self._page_size(page_size, max_results, count + len(beers))
+                if prefetch and after is not None and remaining:
+                    upcoming = asyncio.ensure_future(self._search_page(query, remaining, after))
+                for beer in beers:
+                    yield beer
+                count += len(beers)
+                if after is None or not beers or not remaining:
+                    return
+                if upcoming is not None:
+                    page, upcoming = await upcoming, None
+                else:
+                    page = await self._search_page(query, remaining, after)
+        finally:
+            if upcoming is not None:
+                upcoming.cancel()
+
+    async def _search_page(self, query, first, after=None):
+        results = await _post_graphql(self.transport,
+                                      self._search_operation(query, first, after), query)
+        return self._parse_search_page(results)
+
+    async def get_beer(self, url, fetch=None, fields=None):
+        beer = self._new_beer(url, fields=fields)
+        if fetch and not beer._has_fetched:
+            await beer._populate()
+        return beer
+
+    async def get_beers(self, ids, batch_size=None, fields=None):
+        """Async generator of ``(beer, error)`` tuples. See
+        ``RateBeer.get_beers``; batches are fetched concurrently."""
+        batches = list(self._beer_batches(ids, batch_size, fields))
+        pending = [[beer for beer in beers if not beer._has_fetched] for beers in batches]
+        tasks = [asyncio.ensure_future(self._fetch_batch(beers)) for beers in pending]
+        try:
+            for beers, fetched, task in zip(batches, pending, tasks):
+                errors = dict((id(beer), error) for beer, error in
+                              RateBeer._apply_batch(fetched, await task))
+                for beer in beers:
+                    yield beer, errors.get(id(beer))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def hydrate(self, objects, batch_size=None, ordered=None):
+        """Async generator of ``(model, error)`` tuples. See
+        ``RateBeer.hydrate``; the requests in flight are bounded by the
+        transport's ``concurrency``."""
+        tasks = [asyncio.ensure_future(self._hydrate_job(*job))
+                 for job in self._hydrate_jobs(objects, batch_size)]
+        done = {}
+        position = [0]
+        try:
+            for task in asyncio.as_completed(tasks):
+                for pair in _hydrated(await task, done, position, ordered):
+                    yield pair
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _hydrate_job(self, kind, items):
+        if kind == 'beers':
+            beers = [model for _, model in items]
+            pending = [beer for beer in beers if not beer._has_fetched]
+            try:
+                errors = dict((id(beer), error) for beer, error in
+                              RateBeer._apply_batch(pending, await self._fetch_batch(pending)))
+            except Exception as e:
+                errors = dict((id(beer), e) for beer in beers)
+            return [(index, model, errors.get(id(model))) for index, model in items]
+        (index, brewery), = items
+        try:
+            if not brewery._has_fetched:
+                await brewery._populate()
+        except Exception as e:
+            return [(index, brewery, e)]
+        return [(index, brewery, None)]
+
+    async def _fetch_batch(self, beers):
+        if not beers:
+            return []
+        operations = [op for beer in beers for op in beer._operations()]
+        try:
+            return await _post_graphql(self.transport, operations, None)
+        except rb_exceptions.JSONParseException:
+            return None
+
+    async def beer(self, url):
+        return (await self.get_beer(url, True)).__dict__
+
+    async def get_brewery(self, url, fetch=None):
+        brewery = self._new_brewery(url)
+        if fetch and not brewery._has_fetched:
+            await brewery._populate()
+        return brewery
+
+    async def brewery(self, url):
+        return (await self.get_brewery(url, True)).__dict__
+
+    async def beer_style_list(self):
+        return await _get_record("/top/", self.transport, RateBeer._parse_style_list,
+                                 extract.style_list, _STYLE_MENU_ONLY)
+
+    async def beer_style(self, ident, sort_type=None, sort_order=None):
+        soup = await _get_soup(RateBeer._beer_style_url(ident, sort_type, sort_order),
+                               self.transport, _TABLE_ONLY)
+        for beer in self._parse_beer_style(soup):
+            yield beer
+
+    async def crawl_styles(self, styles=None, sorts=None):
+        """Async generator of the beers of many style listings. See
+        ``RateBeer.crawl_styles``; listings are fetched concurrently, bounded
+        by the transport's ``concurrency``."""
+        if styles is None:
+            styles = sorted((await self.beer_style_list()).values())
+        if sorts is None:
+            sorts = _STYLE_SORTS
+        tasks = {}
+        try:
+            for ident in styles:
+                for sort in sorts:
+                    task = asyncio.ensure_future(self._style_listing(ident, sort))
+                    tasks[task] = (ident, sort)
+            seen = {}
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    ident, sort = tasks.pop(task)
+                    for beer in self._rank_styles(seen, ident, sort, task.result()):
+                        yield beer
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _style_listing(self, ident, sort):
+        return [beer async for beer in self.beer_style(ident, *sort)]
+
+    async def brewers_by_alpha(self, letter):
+        text = await self.transport.post(RateBeer._brewers_url(letter))
+        return self._parse_brewers(soup_helper.BeautifulSoup(text, "lxml"))
+
+    async def iter_brewers_by_alpha(self, letter):
+        """Async generator of the breweries that start with ``letter``. See
+        ``RateBeer.iter_brewers_by_alpha``; here the page is read in full
+        before it is parsed."""
+        for brewery in await self.brewers_by_alpha(letter):
+            yield brewery
+
+    async def all_brewers(self, letters=None):
+        """Async generator of the breweries of every letter, a letter at a
+        time as each arrives. See ``RateBeer.all_brewers``; letters are
+        fetched concurrently, bounded by the transport's ``concurrency``."""
+        if letters is None:
+            letters = list(string.ascii_uppercase) + ['0-9']
+        tasks = [asyncio.ensure_future(self.brewers_by_alpha(letter)) for letter in letters]
+        try:
+            for task in asyncio.as_completed(tasks):
+                for brewery in await task:
+                    yield brewery
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,311 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Response caches for ``Transport`` and ``AsyncTransport``.
+
+Pages are cached under their URL and GraphQL calls under their operations
+and variables, so a cached beer is neither re-downloaded nor re-requested::
+
+    >>> from ratebeer import RateBeer, Transport
+    >>> from ratebeer.cache import SQLiteCache
+    >>> rb = RateBeer(Transport(cache=SQLiteCache('ratebeer.db', ttls={'beer': 600})))
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_HOUR = 60 * 60
+_WEEK = 7 * 24 * _HOUR
+
+# (endpoint, URL fragment), most specific first.
+_ENDPOINTS = [
+    ('brewery_beers', '/ShowBrewerBeers.asp'),
+    ('style', '/ajax/top-beer.asp'),
+    ('styles', '/top/'),
+    ('brewers', '/browsebrewers-'),
+    ('brewery', '/brewers/'),
+    ('reviews', '/beer/'),
+]
+
+DEFAULT_TTLS = {
+    'styles': _WEEK,
+}
+
+
+def _endpoint(url):
+    """Returns the endpoint name of a page URL, used to pick its TTL."""
+    for name, fragment in _ENDPOINTS:
+        if fragment in url:
+            return name
+    return None
+
+
+def _key(method, url, data=None):
+    raw = u'{0} {1} {2}'.format(method, url, data or '')
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+# Pages are stored with their validators so that once they go stale they can
+# be revalidated with a conditional GET instead of downloaded again.
+
+def _dump_page(text, etag, last_modified, ttl):
+    return json.dumps({'text': text,
+                       'etag': etag,
+                       'last_modified': last_modified,
+                       'fresh_until': time.time() + ttl})
+
+
+def _load_page(value):
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def _is_fresh(page):
+    return page is not None and page['fresh_until'] > time.time()
+
+
+def _conditional_headers(page):
+    headers = {}
+    if page is not None:
+        if page.get('etag'):
+            headers['If-None-Match'] = page['etag']
+        if page.get('last_modified'):
+            headers['If-Modified-Since'] = page['last_modified']
+    return headers
+
+
+def _store_page(cache, key, text, etag, last_modified, endpoint):
+    ttl = cache.ttl_for(endpoint)
+    if etag or last_modified:
+        # Keep the page around after it goes stale so it can be revalidated.
+        storage_ttl = ttl + cache.revalidate_ttl
+    else:
+        storage_ttl = ttl
+    cache.set(key, _dump_page(text, etag, last_modified, ttl), storage_ttl)
+
+
+class BaseCache(object):
+    """Interface for response caches.
+
+    Subclasses store text under string keys by implementing ``get``, ``set``,
+    ``delete`` and ``clear``; anything with those methods can be passed to a
+    transport as its ``cache``.
+
+    Args:
+        ttl (float): seconds a response stays fresh (default: one hour). Use
+            ``float('inf')`` to keep responses until they are evicted.
+        ttls (dict): per-endpoint overrides of ``ttl``. Pages are named
+            ``styles``, ``style``, ``brewers``, ``brewery``,
+            ``brewery_beers`` and ``reviews``; GraphQL calls by their
+            operation, such as ``beer`` and ``beerSearch``; and search
+            candidates kept by ``ratebeer.match.Matcher`` as ``match``. The
+            style list defaults to a week.
+        revalidate_ttl (float): seconds a stale page that has an ETag or
+            Last-Modified header is kept for conditional requests
+            (default: 30 days).
+    """
+
+    def __init__(self, ttl=None, ttls=None, revalidate_ttl=None):
+        if ttl is None:
+            ttl = _HOUR
+        if revalidate_ttl is None:
+            revalidate_ttl = 30 * 24 * _HOUR
+        self.ttl = ttl
+        self.revalidate_ttl = revalidate_ttl
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+    def ttl_for(self, endpoint):
+        """Returns the TTL, in seconds, of responses from ``endpoint``."""
+        return self.ttls.get(endpoint, self.ttl)
+
+    def get(self, key):
+        """Returns the fresh value stored under ``key``, or None."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        """Stores ``value`` under ``key`` for ``ttl`` seconds."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Removes ``key`` from the cache."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCache):
+    """In-process cache that evicts the least recently used response.
+
+    Args:
+        maxsize (int): the maximum number of responses kept (default: 1024).
+        ttl, ttls, revalidate_ttl: see ``BaseCache``.
+    """
+
+    def __init__(self, maxsize=None, ttl=None, ttls=None, revalidate_ttl=None):
+        BaseCache.__init__(self, ttl, ttls, revalidate_ttl)
+        if maxsize is None:
+            maxsize = 1024
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                return None
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + ttl, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(BaseCache):
+    """On-disk cache in a single SQLite file, shared between processes and
+    surviving restarts.
+
+    Args:
+        path (string): the database file. Created if it doesn't exist.
+        maxsize (int): if set, the least recently used responses beyond this
+            many are evicted (default: None, no limit).
+        ttl, ttls, revalidate_ttl: see ``BaseCache``.
+    """
+
+    def __init__(self, path, maxsize=None, ttl=None, ttls=None, revalidate_ttl=None):
+        BaseCache.__init__(self, ttl, ttls, revalidate_ttl)
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                             "key TEXT PRIMARY KEY, value TEXT, "
+                             "expires REAL, accessed REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed "
+                             "ON responses (accessed)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, expires FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None or row[1] < now:
+                return None
+            with self._db:
+                self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?",
+                                 (now, key))
+            return row[0]
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                             (key, value, now + ttl, now))
+            self._db.execute("DELETE FROM responses WHERE expires < ?", (now,))
+            if self.maxsize is not None:
+                self._db.execute("DELETE FROM responses WHERE key NOT IN ("
+                                 "SELECT key FROM responses "
+                                 "ORDER BY accessed DESC LIMIT ?)", (self.maxsize,))
+
+    def delete(self, key):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+
+    def close(self):
+        self._db.close()
+
+
+class RedisCache(BaseCache):
+    """Cache backed by a Redis-compatible client, which handles expiry and
+    eviction itself.
+
+    Args:
+        client: anything with redis-py's ``get``, ``set(name, value, ex=)``,
+            ``delete`` and ``scan_iter`` methods, such as ``redis.Redis`` or
+            ``fakeredis.FakeRedis``.
+        prefix (string): prepended to every key (default: "ratebeer:").
+        ttl, ttls, revalidate_ttl: see ``BaseCache``.
+    """
+
+    def __init__(self, client, prefix=None, ttl=None, ttls=None, revalidate_ttl=None):
+        BaseCache.__init__(self, ttl, ttls, revalidate_ttl)
+        if prefix is None:
+            prefix = "ratebeer:"
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def set(self, key, value, ttl):
+        if ttl == float('inf'):
+            self.client.set(self.prefix + key, value)
+        else:
+            self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
@@ -0,0 +1,199 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Resumable crawl of every brewery on RateBeer.com and their beers.
+
+The frontier and what has been crawled are kept in a SQLite file, updated as
+each page completes, so an interrupted crawl picks up where it stopped::
+
+    >>> from ratebeer.crawl import Crawler
+    >>> crawler = Crawler('mirror.db', workers=8)
+    >>> for item in crawler.crawl():
+    ...     save(item)  # populated Brewery and Beer objects
+
+Running the same code again after a crash, or after stopping early, only
+fetches what hasn't been crawled yet.
+"""
+
+import sqlite3
+import string
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    import rb_exceptions
+    import transport as transport_helper
+    from pipeline import Pipeline
+    from ratebeer import RateBeer
+except ImportError:  # No implicit package imports in py3.
+    from ratebeer import rb_exceptions
+    from ratebeer.pipeline import Pipeline
+    from ratebeer import transport as transport_helper
+    from ratebeer.ratebeer import RateBeer
+
+LETTERS = list(string.ascii_uppercase) + ['0-9']
+
+# Deeper pages first, so the frontier stays small.
+_PRIORITY = {'beer': 0, 'brewery': 1, 'letter': 2}
+
+
+class Crawler(object):
+    """Walks ``brewers_by_alpha`` for every letter, then every brewery and
+    each of its beers.
+
+    Args:
+        path (string): the SQLite file holding the crawl state. Created if
+            it doesn't exist, resumed from if it does.
+        rb (RateBeer): the client to fetch with. By default one is created
+            with a connection pool as large as ``workers``.
+        workers (int): the number of pages fetched concurrently (default: 4).
+        letters (list): the letters to start from (default: A-Z and 0-9).
+        max_attempts (int): how often a page that fails with a network or
+            parse error is retried before it is marked failed (default: 3).
+        processes (int): if given, brewery pages are parsed on a
+            ``ratebeer.pipeline.Pipeline`` with this many processes, rather
+            than on the fetching workers.
+    """
+
+    def __init__(self, path, rb=None, workers=None, letters=None, max_attempts=None,
+                 processes=None):
+        if workers is None:
+            workers = 4
+        if letters is None:
+            letters = LETTERS
+        if max_attempts is None:
+            max_attempts = 3
+        if rb is None:
+            rb = RateBeer(transport_helper.Transport(pool_maxsize=workers))
+        self.rb = rb
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._pipeline = None
+        if processes is not None:
+            self._pipeline = Pipeline(rb, workers, processes)
+        self._db = sqlite3.connect(path)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS pages ("
+                             "url TEXT PRIMARY KEY, kind TEXT, priority INTEGER, "
+                             "state TEXT DEFAULT 'pending', attempts INTEGER DEFAULT 0, "
+                             "error TEXT)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS pages_pending "
+                             "ON pages (state, priority)")
+        self._add('letter', letters)
+
+    def _add(self, kind, urls):
+        """Adds pages to the frontier, ignoring any already seen."""
+        with self._db:
+            self._db.executemany("INSERT OR IGNORE INTO pages (url, kind, priority) "
+                                 "VALUES (?, ?, ?)",
+                                 [(url, kind, _PRIORITY[kind]) for url in urls])
+
+    def _pending(self, limit, skip):
+        rows = self._db.execute("SELECT url, kind FROM pages WHERE state = 'pending' "
+                                "ORDER BY priority, rowid LIMIT ?",
+                                (limit + len(skip),)).fetchall()
+        return [row for row in rows if row[0] not in skip][:limit]
+
+    def _mark(self, url, state, error=None):
+        with self._db:
+            self._db.execute("UPDATE pages SET state = ?, error = ? WHERE url = ?",
+                             (state, error, url))
+
+    def _retry(self, url, error):
+        with self._db:
+            self._db.execute("UPDATE pages SET attempts = attempts + 1, error = ?, "
+                             "state = CASE WHEN attempts + 1 >= ? THEN 'failed' "
+                             "ELSE 'pending' END WHERE url = ?",
+                             (error, self.max_attempts, url))
+
+    def _fetch(self, url, kind):
+        """Runs on a worker. Returns the crawled object and the pages it
+        links to as ``(item, children kind, children)``."""
+        if kind == 'letter':
+            return None, 'brewery', [b.url for b in self.rb.brewers_by_alpha(url)]
+        if kind == 'brewery':
+            if self._pipeline is not None:
+                brewery, beers = self._pipeline._brewery_and_beers(url)
+            else:
+                brewery = self.rb.get_brewery(url, True)
+                beers = brewery.get_beers()
+            return brewery, 'beer', [b.url for b in beers]
+        return self.rb.get_beer(url, True), None, []
+
+    def crawl(self):
+        """Generator of every newly crawled ``Brewery`` and ``Beer``, fully
+        populated.
+
+        A page is only checkpointed as done once the consumer asks for the
+        next item, so anything being handled when the crawl is interrupted
+        is crawled again on resume.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        running = {}
+        try:
+            while True:
+                for url, kind in self._pending(self.workers * 2 - len(running), running):
+                    running[url] = (kind, executor.submit(self._fetch, url, kind))
+                if not running:
+                    return
+                wait([future for _, future in running.values()], return_when=FIRST_COMPLETED)
+                for url, (kind, future) in list(running.items()):
+                    if not future.done():
+                        continue
+                    del running[url]
+                    try:
+                        item, child_kind, children = future.result()
+                    except (rb_exceptions.PageNotFound, rb_exceptions.AliasedBeer) as e:
+                        self._mark(url, 'failed', repr(e))
+                        continue
+                    except Exception as e:
+                        self._retry(url, repr(e))
+                        continue
+                    if children:
+                        self._add(child_kind, children)
+                    if item is not None:
+                        yield item
+                    self._mark(url, 'done')
+        finally:
+            for _, future in running.values():
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def stats(self):
+        """Returns ``{kind: {state: count}}`` for every page seen so far."""
+        stats = {}
+        for kind, state, count in self._db.execute(
+                "SELECT kind, state, COUNT(*) FROM pages GROUP BY kind, state"):
+            stats.setdefault(kind, {})[state] = count
+        return stats
+
+    def failures(self):
+        """Returns ``(url, kind, error)`` for every page that failed."""
+        return self._db.execute("SELECT url, kind, error FROM pages "
+                                "WHERE state = 'failed'").fetchall()
+
+    def close(self):
+        if self._pipeline is not None:
+            self._pipeline.close()
+        self._db.close()
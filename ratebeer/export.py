@@ -0,0 +1,245 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Columnar export of beers and reviews to Parquet or Arrow files.
+
+Requires pyarrow (``pip install ratebeer[export]``). Objects are written in
+record batches as they arrive, so a generator such as ``Brewery.get_beers``
+or ``Beer.get_reviews`` is never held in memory all at once::
+
+    >>> from ratebeer.export import write_beers, write_reviews
+    >>> write_beers(rb.beer_style(71), 'dubbels.parquet')
+    >>> write_reviews(beer.get_reviews(), 'reviews.parquet', beer=beer)
+
+Only attributes that are already set are exported; a missing attribute
+becomes a null rather than triggering a fetch.
+"""
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    from identity import _id_from_url
+except ImportError:  # No implicit package imports in py3.
+    from ratebeer.identity import _id_from_url
+
+
+def _int(value):
+    return None if value is None else int(value)
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+def _attr(obj, name):
+    """Returns an attribute of a model object if it is set, else None,
+    without fetching anything."""
+    try:
+        return object.__getattribute__(obj, name)
+    except AttributeError:
+        return (obj._get_extra() or {}).get(name)
+
+
+def _beer_id(beer):
+    ident = _attr(beer, 'id')
+    if ident is not None:
+        return int(ident)
+    return _id_from_url(_attr(beer, 'url'))
+
+
+def _brewery(beer, attr):
+    brewery = _attr(beer, 'brewery')
+    if brewery is None:
+        return None
+    if attr == 'id':
+        return _id_from_url(brewery.url)
+    return _attr(brewery, attr)
+
+
+def _column(name, kind, convert=None):
+    def get(obj, fields):
+        value = fields[name] if name in fields else _attr(obj, name)
+        return convert(value) if convert else value
+    return name, kind, get
+
+
+# (column, type, getter of the value from an object and the extra fields
+# passed to ``write``)
+BEER_COLUMNS = [
+    ('id', 'int', lambda beer, fields: _beer_id(beer)),
+    _column('url', 'string'),
+    _column('name', 'string'),
+    ('brewery_id', 'int', lambda beer, fields: _brewery(beer, 'id')),
+    ('brewery_name', 'string', lambda beer, fields: _brewery(beer, 'name')),
+    _column('style', 'string'),
+    _column('style_url', 'string'),
+    _column('abv', 'float', _float),
+    _column('ibu', 'float', _float),
+    _column('calories', 'float', _float),
+    _column('overall_rating', 'int', _int),
+    _column('style_rating', 'int', _int),
+    _column('num_ratings', 'int', _int),
+    _column('mean_rating', 'float', _float),
+    _column('weighted_avg', 'float', _float),
+    _column('seasonal', 'string'),
+    _column('retired', 'bool'),
+]
+
+REVIEW_COLUMNS = [
+    _column('beer_id', 'int', _int),
+    _column('date', 'date'),
+    _column('rating', 'float', _float),
+    _column('appearance', 'int', _int),
+    _column('aroma', 'int', _int),
+    _column('palate', 'int', _int),
+    _column('taste', 'int', _int),
+    _column('overall', 'int', _int),
+    _column('user_name', 'string'),
+    _column('user_location', 'string'),
+    _column('text', 'string'),
+]
+
+
+class ColumnarWriter(object):
+    """Writes objects to a Parquet or Arrow IPC file in record batches.
+
+    Args:
+        path (string): the file to write.
+        columns (list): ``(name, type, getter)`` column definitions, such as
+            ``BEER_COLUMNS``.
+        batch_size (int): the number of rows buffered before a record batch
+            is written (default: 1024).
+        format (string): "parquet" or "arrow". Defaults to "arrow" for paths
+            ending in .arrow, .feather or .ipc, and "parquet" otherwise.
+    """
+
+    def __init__(self, path, columns, batch_size=None, format=None):
+        if pyarrow is None:
+            raise ImportError("Exporting requires pyarrow. "
+                              "Install it with `pip install ratebeer[export]`.")
+        if batch_size is None:
+            batch_size = 1024
+        if format is None:
+            format = 'arrow' if path.endswith(('.arrow', '.feather', '.ipc')) else 'parquet'
+        types = {
+            'int': pyarrow.int64(),
+            'float': pyarrow.float64(),
+            'string': pyarrow.string(),
+            'bool': pyarrow.bool_(),
+            'date': pyarrow.date32(),
+        }
+        self.columns = columns
+        self.batch_size = batch_size
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind, _ in columns])
+        if format == 'parquet':
+            self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        elif format == 'arrow':
+            self._writer = pyarrow.ipc.new_file(path, self.schema)
+        else:
+            raise ValueError("Invalid ``format``.")
+        self.format = format
+        self.rows_written = 0
+        self._buffer = [[] for _ in columns]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, obj, **fields):
+        """Buffers one object, plus any extra ``fields``, as a row."""
+        for values, (_, _, get) in zip(self._buffer, self.columns):
+            values.append(get(obj, fields))
+        if len(self._buffer[0]) >= self.batch_size:
+            self.flush()
+
+    def write_all(self, objs, **fields):
+        """Writes every object from an iterable, returning how many."""
+        count = 0
+        for obj in objs:
+            self.write(obj, **fields)
+            count += 1
+        return count
+
+    def flush(self):
+        """Writes the buffered rows as a record batch."""
+        if not self._buffer[0]:
+            return
+        arrays = [pyarrow.array(values, type=field.type)
+                  for values, field in zip(self._buffer, self.schema)]
+        batch = pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if self.format == 'parquet':
+            self._writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+        self.rows_written += batch.num_rows
+        self._buffer = [[] for _ in self.columns]
+
+    def close(self):
+        """Flushes the remaining rows and finishes the file."""
+        self.flush()
+        self._writer.close()
+
+
+class BeerWriter(ColumnarWriter):
+    """``ColumnarWriter`` for ``Beer`` objects. See ``BEER_COLUMNS``."""
+
+    def __init__(self, path, batch_size=None, format=None):
+        ColumnarWriter.__init__(self, path, BEER_COLUMNS, batch_size, format)
+
+
+class ReviewWriter(ColumnarWriter):
+    """``ColumnarWriter`` for ``Review`` objects. Pass ``beer_id`` to
+    ``write``/``write_all`` to record which beer the reviews are for."""
+
+    def __init__(self, path, batch_size=None, format=None):
+        ColumnarWriter.__init__(self, path, REVIEW_COLUMNS, batch_size, format)
+
+
+def write_beers(beers, path, batch_size=None, format=None):
+    """Writes an iterable of ``Beer`` objects to ``path``.
+
+    Returns:
+        The number of beers written.
+    """
+    with BeerWriter(path, batch_size, format) as writer:
+        return writer.write_all(beers)
+
+
+def write_reviews(reviews, path, beer=None, batch_size=None, format=None):
+    """Writes an iterable of ``Review`` objects to ``path``, tagged with the
+    id of ``beer`` if given.
+
+    Returns:
+        The number of reviews written.
+    """
+    beer_id = _beer_id(beer) if beer is not None else None
+    with ReviewWriter(path, batch_size, format) as writer:
+        return writer.write_all(reviews, beer_id=beer_id)
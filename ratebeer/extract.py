@@ -0,0 +1,114 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""lxml extractors for the pages that are most expensive to parse.
+
+Each takes the text of a page and returns plain records instead of soup, using
+XPath on an lxml tree rather than building a BeautifulSoup tree. They are used
+instead of the BeautifulSoup code paths when a transport is created with
+``parser='lxml'``.
+"""
+
+import re
+
+import lxml.html
+
+_BUSINESS = '//div[@itemtype="http://schema.org/LocalBusiness"]'
+
+
+def _first_text(element, path):
+    found = element.xpath(path)
+    return found[0].text_content().strip() if found else None
+
+
+def brewery(text):
+    """Returns a dict of brewery attributes, or None if the page has none."""
+    tree = lxml.html.fromstring(text)
+    business = tree.xpath(_BUSINESS)
+    if not business:
+        return None
+    business = business[0]
+
+    record = {
+        'name': tree.xpath('//h1')[0].text_content(),
+        'type': business.xpath('.//div')[1].text_content().strip(),
+    }
+    website = business.xpath('.//div[contains(concat(" ", normalize-space(@class), " "), '
+                             '" media-links ")]//a/@href')
+    if website:
+        record['web'] = website[0]
+    for attr, item_prop in [('telephone', 'telephone'),
+                            ('street', 'streetAddress'),
+                            ('city', 'addressLocality'),
+                            ('state', 'addressRegion'),
+                            ('country', 'addressCountry'),
+                            ('postal_code', 'postalCode')]:
+        record[attr] = _first_text(business, './/span[@itemprop="{0}"]'.format(item_prop))
+    return record
+
+
+def brewery_beers(text):
+    """Returns a dict per ratable beer in a brewery's beer table, holding the
+    ``url`` and ``name`` and whichever of ``abv``, ``weighted_avg``,
+    ``style_rating`` and ``num_ratings`` are listed."""
+    tree = lxml.html.fromstring(text)
+    table = tree.xpath('//table[@id="brewer-beer-table"]')[0]
+    records = []
+    for row in table.xpath('.//tr')[1:]:
+        link = row.xpath('.//a')
+        # Only return rows that are ratable
+        if not link or not row.xpath('.//a[@title="Rate this beer"]'):
+            continue
+        # Remove any whitespace characters. Rare, but possible.
+        record = {
+            'url': re.sub(r"\s+", "", link[0].get('href'), flags=re.UNICODE),
+            'name': link[0].text_content().strip(),
+        }
+        cells = [td.text_content() for td in row.xpath('.//td')]
+        _add_row_values(record, cells)
+        records.append(record)
+    return records
+
+
+def _add_row_values(record, cells):
+    abv = cells[1]
+    weighted_avg = cells[4].strip()
+    style_rating = cells[5].strip()
+    num_ratings = cells[6].strip()
+    if abv and abv != '-':
+        record['abv'] = float(abv)
+    if weighted_avg:
+        record['weighted_avg'] = float(weighted_avg)
+    if style_rating:
+        record['style_rating'] = int(style_rating)
+    if num_ratings:
+        record['num_ratings'] = int(num_ratings)
+
+
+def style_list(text):
+    """Returns a dict of beer style names to style ids."""
+    tree = lxml.html.fromstring(text)
+    return dict((option.text_content().strip(), int(option.get('value')))
+                for option in tree.xpath('//select[@id="StyleMenu"]//option[@name!=""]'))
@@ -0,0 +1,97 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""One object per beer and per brewery, for a client created with
+``identity_map=True``::
+
+    >>> from ratebeer import RateBeer
+    >>> rb = RateBeer(identity_map=True)
+    >>> beer = rb.get_beer('/beer/new-belgium-tour-de-fall/279122/', True)
+    >>> beer.brewery is rb.get_brewery(beer.brewery.url)
+    True
+"""
+
+import re
+import threading
+import weakref
+
+_ID = re.compile(r'/(\d+)/?$')
+
+
+class IdentityMap(object):
+    """Weak map from beer and brewery ids to the object for each.
+
+    Objects are only held while something else refers to them, so a long
+    crawl doesn't keep every beer it has seen in memory.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._objects = weakref.WeakValueDictionary()
+
+    def get(self, cls, url=None, id=None, create=None):
+        """Returns the ``cls`` object for the beer or brewery at ``url`` or
+        with ``id``, calling ``create()`` to make it if there is none yet.
+
+        Objects without an id in their url or ``id`` are never shared.
+        """
+        key = _key(cls, url, id)
+        if key is None:
+            return create()
+        with self._lock:
+            obj = self._objects.get(key)
+        if obj is None:
+            # Made outside the lock, so that a slow ``create`` doesn't hold up
+            # other threads. If another thread stored one first, it wins.
+            created = create()
+            with self._lock:
+                obj = self._objects.setdefault(key, created)
+        if url is not None and obj.url is None:
+            obj.url = url
+        return obj
+
+    def __len__(self):
+        return len(self._objects)
+
+    def clear(self):
+        """Forgets every object."""
+        with self._lock:
+            self._objects.clear()
+
+
+def _key(cls, url, id):
+    if id is None:
+        id = _id_from_url(url)
+    if id is None:
+        return None
+    return cls, str(id)
+
+
+def _id_from_url(url):
+    """Returns the numeric id at the end of a beer or brewery URL, or None."""
+    if url is None:
+        return None
+    match = _ID.search(str(url))
+    return int(match.group(1)) if match else None
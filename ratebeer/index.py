@@ -0,0 +1,325 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""A local, searchable store of beers and breweries::
+
+    >>> from ratebeer import RateBeer
+    >>> rb = RateBeer(offline_index='beers.db')
+    >>> rb.get_beer('/beer/deschutes-inversion-ipa/55610/', True)  # fetched once
+    >>> rb.offline_index.find(style='IPA', min_abv=6, order_by='overall_rating')
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    import models
+    from identity import _id_from_url
+except ImportError:  # No implicit package imports in py3.
+    from ratebeer import models
+    from ratebeer.identity import _id_from_url
+
+# Attributes stored as plain columns, in table order.
+_BEER_COLUMNS = ('url', 'name', 'style', 'style_url', 'abv', 'ibu', 'calories',
+                 'overall_rating', 'style_rating', 'num_ratings', 'mean_rating',
+                 'weighted_avg', 'seasonal', 'retired', 'description', 'img_url')
+_BREWERY_COLUMNS = ('name', 'type', 'web', 'telephone', 'street', 'city',
+                    'state', 'country', 'postal_code')
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS beers ("
+    "rowid INTEGER PRIMARY KEY, id TEXT UNIQUE, " + ", ".join(_BEER_COLUMNS) + ", "
+    "tags TEXT, brewery_id INTEGER, brewery_url TEXT, brewery_name TEXT, "
+    "complete INTEGER DEFAULT 0, updated REAL)",
+    "CREATE INDEX IF NOT EXISTS beers_style ON beers (style)",
+    "CREATE INDEX IF NOT EXISTS beers_brewery ON beers (brewery_id)",
+    "CREATE INDEX IF NOT EXISTS beers_abv ON beers (abv)",
+    "CREATE INDEX IF NOT EXISTS beers_rating ON beers (overall_rating)",
+    "CREATE INDEX IF NOT EXISTS beers_url ON beers (url)",
+    "CREATE TABLE IF NOT EXISTS breweries ("
+    "rowid INTEGER PRIMARY KEY, url TEXT UNIQUE, id INTEGER, " + ", ".join(_BREWERY_COLUMNS) + ", "
+    "complete INTEGER DEFAULT 0, updated REAL)",
+    "CREATE INDEX IF NOT EXISTS breweries_id ON breweries (id)",
+]
+
+_FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS beers_fts USING fts5(name, brewery, description, tags)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS breweries_fts USING fts5(name, city)",
+]
+
+_ORDER_BY = ('abv', 'overall_rating', 'style_rating', 'num_ratings', 'name')
+
+
+class Index(object):
+    """Beers and breweries stored in a SQLite file, with full-text search
+    over beer names, brewery names, descriptions and tags, and indexes on style, brewery,
+    abv and overall rating.
+
+    Objects are stored with the attributes they have already fetched and
+    nothing is fetched to fill the gaps; storing the same beer again only
+    overwrites the attributes it has. Beers and breweries that were fully
+    fetched are marked complete, and only those are returned by
+    ``get_beer`` and ``get_brewery``.
+
+    Args:
+        path (string): the database file. Created if it doesn't exist.
+
+    Without SQLite's FTS5 extension, ``search`` falls back to matching
+    names with LIKE.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+            try:
+                for statement in _FTS_SCHEMA:
+                    self._db.execute(statement)
+                self.full_text = True
+            except sqlite3.OperationalError:
+                self.full_text = False
+
+    def add(self, obj):
+        """Stores a ``Beer`` or ``Brewery``."""
+        if isinstance(obj, models.Beer):
+            self._add_beer(obj)
+        elif isinstance(obj, models.Brewery):
+            self._add_brewery(obj)
+        else:
+            raise TypeError("Only beers and breweries can be indexed.")
+
+    def add_all(self, objs):
+        """Stores every ``Beer`` and ``Brewery`` in ``objs``, such as the
+        items of a ``ratebeer.crawl.Crawler``."""
+        for obj in objs:
+            self.add(obj)
+
+    def _add_beer(self, beer):
+        data = beer.__dict__
+        if data.get('id') is None and data.get('url') is None:
+            raise ValueError("A beer needs an id or a URL to be indexed.")
+        values = dict((column, data[column]) for column in _BEER_COLUMNS if column in data)
+        if 'tags' in data:
+            values['tags'] = json.dumps(data['tags'])
+        brewery = data.get('brewery')
+        if brewery is not None:
+            values['brewery_url'] = brewery.url
+            values['brewery_id'] = _id_from_url(brewery.url)
+            values['brewery_name'] = brewery.__dict__.get('name')
+        ident = data.get('id')
+        if ident is None:
+            ident = _id_from_url(data['url'])
+        if ident is None:
+            return  # Nothing to key the row on.
+        ident = str(ident)
+        with self._lock, self._db:
+            if brewery is not None:
+                self._store_brewery(brewery)
+            rowid = self._upsert('beers', 'id', ident, values, data.get('_has_fetched'))
+            if self.full_text:
+                row = self._db.execute("SELECT name, brewery_name, description, tags "
+                                       "FROM beers WHERE rowid = ?", (rowid,)).fetchone()
+                self._db.execute("DELETE FROM beers_fts WHERE rowid = ?", (rowid,))
+                self._db.execute("INSERT INTO beers_fts (rowid, name, brewery, description, tags) "
+                                 "VALUES (?, ?, ?, ?, ?)",
+                                 (rowid, row[0], row[1], row[2],
+                                  ' '.join(json.loads(row[3] or 'null') or [])))
+
+    def _add_brewery(self, brewery):
+        with self._lock, self._db:
+            self._store_brewery(brewery)
+
+    def _store_brewery(self, brewery):
+        data = brewery.__dict__
+        values = dict((column, data[column]) for column in _BREWERY_COLUMNS if column in data)
+        values['id'] = _id_from_url(brewery.url)
+        rowid = self._upsert('breweries', 'url', brewery.url, values, data.get('_has_fetched'))
+        if self.full_text:
+            row = self._db.execute("SELECT name, city FROM breweries WHERE rowid = ?",
+                                   (rowid,)).fetchone()
+            self._db.execute("DELETE FROM breweries_fts WHERE rowid = ?", (rowid,))
+            self._db.execute("INSERT INTO breweries_fts (rowid, name, city) "
+                             "VALUES (?, ?, ?)", (rowid, row[0], row[1]))
+
+    def _upsert(self, table, key, ident, values, complete):
+        """Updates the given columns of a row, inserting it if needed, and
+        returns its rowid."""
+        values = dict(values, updated=time.time())
+        row = self._db.execute("SELECT rowid FROM {0} WHERE {1} = ?".format(table, key),
+                               (ident,)).fetchone()
+        if row is None:
+            values[key] = ident
+            values['complete'] = 1 if complete else 0
+            columns = sorted(values)
+            cursor = self._db.execute("INSERT INTO {0} ({1}) VALUES ({2})".format(
+                table, ', '.join(columns), ', '.join('?' * len(columns))),
+                [values[column] for column in columns])
+            return cursor.lastrowid
+        columns = sorted(values)
+        self._db.execute("UPDATE {0} SET {1}, complete = MAX(complete, ?) WHERE rowid = ?".format(
+            table, ', '.join('{0} = ?'.format(column) for column in columns)),
+            [values[column] for column in columns] + [1 if complete else 0, row[0]])
+        return row[0]
+
+    def get_beer(self, url, transport=None):
+        """Returns the complete ``Beer`` stored for a URL or id, or None."""
+        ident = str(url) if '/' not in str(url) else _id_from_url(url)
+        if ident is None:
+            return None
+        rows = self._select_beers("WHERE id = ? AND complete = 1", (str(ident),))
+        return self._beer(rows[0], transport) if rows else None
+
+    def get_brewery(self, url, transport=None):
+        """Returns the complete ``Brewery`` stored for a URL, or None."""
+        rows = self._select("SELECT url, {0}, complete FROM breweries "
+                            "WHERE id = ? AND complete = 1".format(', '.join(_BREWERY_COLUMNS)),
+                            (_id_from_url(url),))
+        return self._brewery(rows[0], transport) if rows else None
+
+    def search(self, query, limit=None, transport=None):
+        """Searches the names, descriptions and tags of stored beers and the
+        names of stored breweries, best matches first.
+
+        Returns:
+            A dictionary with the lists ``beers`` and ``breweries``, like
+            ``RateBeer.search``.
+        """
+        if limit is None:
+            limit = 20
+        words = re.findall(r'\w+', query, re.UNICODE)
+        if not words:
+            return {'beers': [], 'breweries': []}
+        if self.full_text:
+            match = ' '.join('"{0}"'.format(word) for word in words)
+            beers = self._select_beers(
+                "JOIN beers_fts ON beers_fts.rowid = beers.rowid "
+                "WHERE beers_fts MATCH ? ORDER BY bm25(beers_fts, 10.0, 3.0, 1.0, 2.0) LIMIT ?",
+                (match, limit))
+            breweries = self._select(
+                "SELECT breweries.url, {0}, complete FROM breweries "
+                "JOIN breweries_fts ON breweries_fts.rowid = breweries.rowid "
+                "WHERE breweries_fts MATCH ? ORDER BY rank LIMIT ?".format(
+                    ', '.join('breweries.' + c for c in _BREWERY_COLUMNS)),
+                ('name : (' + match + ')', limit))
+        else:
+            like = '%' + '%'.join(words) + '%'
+            beers = self._select_beers("WHERE name LIKE ? LIMIT ?", (like, limit))
+            breweries = self._select("SELECT url, {0}, complete FROM breweries "
+                                     "WHERE name LIKE ? LIMIT ?".format(', '.join(_BREWERY_COLUMNS)),
+                                     (like, limit))
+        return {'beers': [self._beer(row, transport) for row in beers],
+                'breweries': [self._brewery(row, transport) for row in breweries]}
+
+    def find(self, style=None, brewery=None, min_abv=None, max_abv=None,
+             min_rating=None, order_by=None, limit=None, transport=None):
+        """Returns stored beers matching every given filter.
+
+        Args:
+            style (string): the exact style name.
+            brewery (string): the brewery's URL or id.
+            min_abv, max_abv (float): bounds on the abv.
+            min_rating (int): the lowest overall rating.
+            order_by (string): "abv", "overall_rating", "style_rating",
+                "num_ratings" or "name"; numbers sort highest first.
+            limit (int): the most beers returned (default: all).
+        """
+        conditions, params = [], []
+        if style is not None:
+            conditions.append("style = ?")
+            params.append(style)
+        if brewery is not None:
+            conditions.append("brewery_id = ?")
+            params.append(_id_from_url(brewery) if '/' in str(brewery) else int(brewery))
+        if min_abv is not None:
+            conditions.append("abv >= ?")
+            params.append(min_abv)
+        if max_abv is not None:
+            conditions.append("abv <= ?")
+            params.append(max_abv)
+        if min_rating is not None:
+            conditions.append("overall_rating >= ?")
+            params.append(min_rating)
+        clause = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        if order_by is not None:
+            if order_by not in _ORDER_BY:
+                raise ValueError("Invalid ``order_by``.")
+            clause += " ORDER BY {0}{1}".format(order_by, '' if order_by == 'name' else ' DESC')
+        if limit is not None:
+            clause += " LIMIT ?"
+            params.append(limit)
+        return [self._beer(row, transport) for row in self._select_beers(clause, params)]
+
+    def _select(self, sql, params):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _select_beers(self, clause, params):
+        columns = ', '.join('beers.' + c for c in ('id',) + _BEER_COLUMNS + (
+            'tags', 'brewery_url', 'brewery_name', 'complete'))
+        return self._select("SELECT {0} FROM beers {1}".format(columns, clause), params)
+
+    def _beer(self, row, transport):
+        beer = models._shared(models.Beer, row[1], transport, id=row[0])
+        # The identity map may hand back a beer that is already loaded; only
+        # fill in what it doesn't have.
+        loaded = beer.__dict__
+        for column, value in zip(_BEER_COLUMNS[1:], row[2:]):
+            if column not in loaded and (value is not None or row[-1]):
+                setattr(beer, column, bool(value) if column == 'retired' and value is not None
+                        else value)
+        tags, brewery_url, brewery_name, complete = row[len(_BEER_COLUMNS) + 1:]
+        if tags is not None and 'tags' not in loaded:
+            beer.tags = json.loads(tags)
+        if brewery_url is not None and 'brewery' not in loaded:
+            beer.brewery = beer._new_brewery(brewery_url)
+            if 'name' not in beer.brewery.__dict__:
+                beer.brewery.name = brewery_name
+        if complete:
+            if 'brewed_at' not in loaded:
+                beer.brewed_at = None
+            beer._has_fetched = True
+        return beer
+
+    def _brewery(self, row, transport):
+        brewery = models._shared(models.Brewery, row[0], transport)
+        loaded = brewery.__dict__
+        for column, value in zip(_BREWERY_COLUMNS, row[1:]):
+            if column not in loaded and (value is not None or row[-1]):
+                setattr(brewery, column, value)
+        if row[-1]:
+            brewery._has_fetched = True
+        return brewery
+
+    def __len__(self):
+        return self._select("SELECT COUNT(*) FROM beers", ())[0][0]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,189 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Reconciling beer names against RateBeer.com search, in bulk::
+
+    >>> from ratebeer.match import Matcher
+    >>> matcher = Matcher(workers=8)
+    >>> pairs = [('Summit Brewing Co.', 'Extra Pale Ale'), ('Deschutes', 'Inversion IPA')]
+    >>> for (brewery, name), (matches, error) in zip(pairs, matcher.match(pairs)):
+    ...     beer, score = matches[0]
+"""
+
+import difflib
+import hashlib
+import json
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import cache as cache_helper
+    import transport as transport_helper
+    from ratebeer import RateBeer
+except ImportError:  # No implicit package imports in py3.
+    from ratebeer import cache as cache_helper
+    from ratebeer import transport as transport_helper
+    from ratebeer.ratebeer import RateBeer
+
+# Words that say nothing about which beer is meant.
+_NOISE = frozenset(['the', 'and', 'brewery', 'brewing', 'brewers', 'brewer',
+                    'company', 'co', 'inc', 'ltd', 'llc', 'beer', 'beers'])
+
+
+def normalise(text):
+    """Returns ``text`` lowercased, without accents, punctuation or filler
+    words such as "brewing" and "company"."""
+    if not text:
+        return u''
+    if not isinstance(text, type(u'')):
+        text = text.decode('utf-8')
+    text = unicodedata.normalize('NFKD', text)
+    text = u''.join(c for c in text if not unicodedata.combining(c)).lower()
+    words = re.sub(r"[^\w\s]|_", u' ', text.replace(u"'", u'')).split()
+    return u' '.join(word for word in words if word not in _NOISE)
+
+
+def similarity(a, b):
+    """Returns how alike two names are, from 0 to 1.
+
+    The mean of the ``difflib`` ratio of their sorted words, which forgives
+    reordering and small spelling differences, and the share of words they
+    have in common.
+    """
+    a, b = set(normalise(a).split()), set(normalise(b).split())
+    if not a or not b:
+        return 0.0
+    ratio = difflib.SequenceMatcher(None, u' '.join(sorted(a)), u' '.join(sorted(b))).ratio()
+    return (ratio + len(a & b) / float(len(a | b))) / 2
+
+
+class Matcher(object):
+    """Matches (brewery, beer name) pairs to RateBeer beers.
+
+    Pairs that normalise to the same search are searched once, searches run
+    on a pool of workers, and the candidates of every search are kept in
+    ``cache`` so that later batches, or later runs with a persistent cache,
+    don't search again.
+
+    Args:
+        rb (RateBeer): the client to search with. By default one is created
+            with a connection pool as large as ``workers``.
+        workers (int): the number of searches run at once (default: 8).
+        limit (int): the number of candidates scored per search (default:
+            20).
+        cache (BaseCache): where to keep the candidates of each search, such
+            as a ``ratebeer.cache.SQLiteCache``. Entries use the ``match``
+            TTL (default: an in-memory cache).
+    """
+
+    def __init__(self, rb=None, workers=None, limit=None, cache=None):
+        if workers is None:
+            workers = 8
+        if limit is None:
+            limit = 20
+        if cache is None:
+            cache = cache_helper.MemoryCache(maxsize=65536)
+        if rb is None:
+            rb = RateBeer(transport_helper.Transport(pool_maxsize=workers))
+        self.rb = rb
+        self.workers = workers
+        self.limit = limit
+        self.cache = cache
+
+    def match(self, pairs, min_score=None):
+        """Generator of the ranked matches of each pair, in order.
+
+        Args:
+            pairs (iterable): ``(brewery, name)`` tuples. The brewery may be
+                None or empty if it isn't known.
+            min_score (float): leave out candidates scoring below this
+                (default: 0).
+
+        Returns:
+            A generator of ``(matches, error)`` tuples, one per pair.
+            ``matches`` is a list of ``(beer, score)`` tuples, best first;
+            ``error`` is None, or the exception that failed the pair's
+            search.
+        """
+        if min_score is None:
+            min_score = 0
+        pairs = list(pairs)
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            searches = {}
+            for brewery, name in pairs:
+                query = _query(brewery, name)
+                if query not in searches:
+                    searches[query] = executor.submit(self._candidates, query)
+            for brewery, name in pairs:
+                try:
+                    candidates = searches[_query(brewery, name)].result()
+                except Exception as e:
+                    yield [], e
+                    continue
+                yield self._rank(candidates, brewery, name, min_score), None
+        finally:
+            executor.shutdown(wait=False)
+
+    def _candidates(self, query):
+        """Returns the search results for ``query`` as plain dicts."""
+        if not query:
+            return []
+        key = _cache_key(query, self.limit)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        candidates = [{'url': beer.url, 'id': beer.id, 'name': beer.name,
+                       'overall_rating': beer.overall_rating,
+                       'num_ratings': beer.num_ratings}
+                      for beer in self.rb.iter_search(query, page_size=self.limit,
+                                                      max_results=self.limit)]
+        self.cache.set(key, json.dumps(candidates), self.cache.ttl_for('match'))
+        return candidates
+
+    def _rank(self, candidates, brewery, name, min_score):
+        target = u'{0} {1}'.format(brewery or u'', name or u'')
+        ranked = []
+        for candidate in candidates:
+            score = similarity(target, candidate['name'])
+            if score < min_score:
+                continue
+            beer = self.rb._new_beer(candidate['url'], id=candidate['id'])
+            beer.name = candidate['name']
+            beer.overall_rating = candidate['overall_rating']
+            beer.num_ratings = candidate['num_ratings']
+            ranked.append((beer, score))
+        ranked.sort(key=lambda match: -match[1])
+        return ranked
+
+
+def _query(brewery, name):
+    return normalise(u'{0} {1}'.format(brewery or u'', name or u''))
+
+
+def _cache_key(query, limit):
+    raw = u'match {0} {1}'.format(limit, query)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
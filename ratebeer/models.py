@@ -24,23 +24,161 @@
 # For more information, please refer to <http://unlicense.org/>
 
 import re
-import requests
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from bs4 import SoupStrainer
+
 try:
+    import extract
     import rb_exceptions
     import soup as soup_helper
+    import stats as stats_helper
+    import transport as transport_helper
 except ImportError:  # No implicit package imports in py3.
+    from ratebeer import extract
     from ratebeer import rb_exceptions
     from ratebeer import soup as soup_helper
+    from ratebeer import stats as stats_helper
+    from ratebeer import transport as transport_helper
+
+# Only the parts of each page that are read are parsed.
+_REVIEWS_ONLY = SoupStrainer('div', class_='reviews-container')
+_BEER_TABLE_ONLY = SoupStrainer('table', id='brewer-beer-table')
+
+
+class _Record(object):
+    """Base of the model classes.
+
+    Known attributes are stored in ``__slots__`` rather than a per-instance
+    dict, which keeps millions of objects affordable. Anything else that is
+    set goes into a dict that is only created when first needed, and
+    ``__dict__`` returns a snapshot of every attribute that is set.
+    """
+    __slots__ = ('_extra', '__weakref__')
+
+    # Attributes that are not part of ``__dict__`` or the pickled state.
+    _unlisted = ('_extra', '__weakref__', '_transport')
 
+    def __setattr__(self, name, value):
+        """Set the `name` attribute to `value."""
+        try:
+            object.__setattr__(self, name, value)
+        except AttributeError:
+            extra = self._get_extra()
+            if extra is None:
+                extra = {}
+                object.__setattr__(self, '_extra', extra)
+            extra[name] = value
 
-class Beer(object):
+    def __getattr__(self, item):
+        """Return the value of a custom attribute."""
+        extra = self._get_extra()
+        if extra is not None and item in extra:
+            return extra[item]
+        raise AttributeError('{0} has no attribute {1}'.format(type(self), item))
+
+    def _get_extra(self):
+        try:
+            return object.__getattribute__(self, '_extra')
+        except AttributeError:
+            return None
+
+    @property
+    def __dict__(self):
+        result = {}
+        for cls in reversed(type(self).__mro__):
+            for name in cls.__dict__.get('__slots__', ()):
+                if name in self._unlisted:
+                    continue
+                try:
+                    result[name] = object.__getattribute__(self, name)
+                except AttributeError:
+                    pass
+        result.update(self._get_extra() or {})
+        return result
+
+    def __getstate__(self):
+        """Provide state information for pickling"""
+        return self.__dict__
+
+    def __setstate__(self, statedata):
+        """Reset the state after pickling"""
+        for name, value in statedata.items():
+            setattr(self, name, value)
+
+
+class _LazyRecord(_Record):
+    """Base of ``Beer`` and ``Brewery``, which fetch their page the first time
+    an attribute that isn't set is read."""
+    __slots__ = ()
+
+    def __getattr__(self, item):
+        """Return the value of the `attr` attribute."""
+        extra = self._get_extra()
+        if extra is not None and item in extra:
+            return extra[item]
+        elif not item.startswith('_') and not self._has_fetched:
+            self._populate_missing(item)
+            return getattr(self, item)
+        raise AttributeError('{0} has no attribute {1}'.format(type(self), item))
+
+    def _populate_missing(self, item):
+        """Fetches what is needed to read the unset attribute ``item``."""
+        self._populate()
+
+    def __setstate__(self, statedata):
+        """Reset the state after pickling"""
+        _Record.__setstate__(self, statedata)
+        self._transport = transport_helper.get_default()
+
+
+# The selection in the ``beer`` GraphQL query that each Beer attribute is read
+# from. Attributes without one are derived or come from another operation.
+_BEER_SELECTIONS = {
+    'name': 'name',
+    'brewery': 'brewer { \n id \n name \n __typename \n }',
+    'brewed_at': '',
+    'overall_rating': 'overallScore',
+    'style_rating': 'styleScore',
+    'style': 'style { \n id \n name \n __typename \n }',
+    'style_url': 'style { \n id \n name \n __typename \n }',
+    'img_url': '',
+    'num_ratings': 'ratingCount',
+    'mean_rating': 'averageRating',
+    'weighted_avg': '',
+    'seasonal': 'seasonal',
+    'ibu': 'ibu',
+    'calories': 'calories',
+    'abv': 'abv',
+    'retired': 'isRetired',
+    'description': 'description',
+    'tags': '',
+}
+
+# Attributes fetched together when one of them is first read from a Beer
+# created with ``fields``.
+_BEER_FIELD_GROUPS = (
+    ('name', 'brewery', 'brewed_at', 'img_url'),
+    ('overall_rating', 'style_rating', 'num_ratings', 'mean_rating', 'weighted_avg'),
+    ('abv', 'ibu', 'calories', 'seasonal', 'retired', 'style', 'style_url'),
+    ('description',),
+    ('tags',),
+)
+
+
+class Beer(_LazyRecord):
     """The Beer object. Contains information about an individual beer.
 
     Args:
         url (string): the URL of the beer you're looking for.
+        transport (Transport): the pooled transport to fetch through. Defaults
+            to the module-wide transport.
+        fields (list): if given, only these attributes (and ``name``) are
+            fetched, and the alias check is skipped. Reading any other
+            attribute later fetches just its group of related attributes.
 
     Returns:
         abv (float): percentage alcohol
@@ -66,37 +204,28 @@ class Beer(object):
         Any attributes not available will be returned as None
 
     """
-    def __init__(self, url, fetch=None, id=None):
+    __slots__ = ('url', 'id', 'name', 'brewery', 'brewed_at', 'overall_rating',
+                 'style_rating', 'style', 'style_url', 'img_url', 'num_ratings',
+                 'mean_rating', 'weighted_avg', 'seasonal', 'ibu', 'calories',
+                 'abv', 'retired', 'description', 'tags', '_has_fetched',
+                 '_transport', '_fields')
+
+    _unlisted = _LazyRecord._unlisted + ('_fields',)
+
+    def __init__(self, url, fetch=None, id=None, transport=None, fields=None):
         """Initialize with URL and do not fetch"""
+        if transport is None:
+            transport = transport_helper.get_default()
+        self._transport = transport
         self.url = url
         self.id = id
+        self._has_fetched = False
+        if fields is not None:
+            self._fields = _check_fields(fields)
         if fetch is None:
             fetch = False
         if fetch:
             self._populate()
-        self._has_fetched = fetch
-
-    def __getattr__(self, item):
-        """Return the value of the `attr` attribute."""
-        if item in self.__dict__.keys():
-            return self.__dict__[item]
-        elif not self._has_fetched:
-            self._populate()
-            return getattr(self, item)
-        raise AttributeError('{0} has no attribute {1}'.format(type(self), item))
-
-    def __setattr__(self, name, value):
-        """Set the `name` attribute to `value."""
-        object.__setattr__(self, name, value)
-
-    def __getstate__(self):
-        """Provide state information for pickling"""
-        result = self.__dict__.copy()
-        return result
-
-    def __setstate__(self, statedata):
-        """Reset the state after pickling"""
-        self.__dict__ = statedata
 
     def __repr__(self):
         """Unambiguous representation to recreate object"""
@@ -113,11 +242,47 @@ class Beer(object):
         else:
             return value
 
-    def _populate(self):
+    def _populate(self, fields=None):
+        with stats_helper._timed(self._transport.stats, 'populate_seconds', 'beer'):
+            response = self._transport.graphql(self._operations(fields))
+
+            try:
+                results = json.loads(response)
+            except:
+                raise rb_exceptions.JSONParseException(self.id)
+
+            return self._apply(results, fields)
+
+    def _populate_missing(self, item):
+        if getattr(self, '_fields', None) is None:
+            return self._populate()
+        for group in _BEER_FIELD_GROUPS:
+            if item in group:
+                return self._populate(group)
+        raise AttributeError('{0} has no attribute {1}'.format(type(self), item))
+
+    def _selection(self, fields):
+        """Returns the attributes to fetch: ``fields``, else those the beer
+        was created with, or None for everything."""
+        if fields is None:
+            return getattr(self, '_fields', None)
+        return _check_fields(fields)
+
+    def _operations(self, fields=None):
+        """Returns the batched GraphQL operations that describe this beer.
+
+        Args:
+            fields (list): the attributes to fetch (default: the beer's
+                ``fields``, or everything).
+        """
         if not self.id:
             self.id = self.url.split('/')[-2]
 
-        data = [
+        fields = self._selection(fields)
+        if fields is not None:
+            return self._selective_operations(fields)
+
+        return [
                  {"operationName":"beer",
                   "variables":{"beerId":self.id},
                   "query":"query beer($beerId: ID!) { \n info: beer(id: $beerId) { \n id \n name \n description \n style { \n id \n name \n glasses { \n id \n name \n __typename \n } \n __typename \n } \n styleScore \n overallScore \n averageRating \n abv \n ibu \n calories \n brewer { \n id \n name \n __typename \n } \n ratingCount \n isRetired \n isUnrateable \n seasonal \n labels \n availability { \n bottle \n tap \n distribution \n __typename \n } \n __typename \n } \n} \n"},
@@ -131,66 +296,132 @@ class Beer(object):
                  {"operationName":"beerByAlias",
                   "variables":{"aliasId":self.id},
                   "query":"query beerByAlias($aliasId: ID!) {\n beerByAlias(aliasId: $aliasId) {\n id\n name \n overallScore \n __typename \n } \n } \n"},
-                 {"operationName":"tagDisplay",
-                  "variables":{"beerId":self.id},
-                  "query":"query tagDisplay($beerId: ID!, $first: Int) { \n tagDisplayArr: beerTags(beerId: $beerId, first: $first) { \n items { \n id \n urlName: plain \n __typename \n } \n __typename \n } \n} \n"
-                 }
+                 self._tag_operation()
                 ]
-        
-        request = requests.post(
-            "https://beta.ratebeer.com/v1/api/graphql/"
-           ,data=json.dumps(data)
-           ,headers={"content-type": "application/json"}
-        )
 
-        try:
-            results = json.loads(request.text)
-        except:
-            raise rb_exceptions.JSONParseException(self.id)
+    def _tag_operation(self):
+        return {"operationName":"tagDisplay",
+                "variables":{"beerId":self.id},
+                "query":"query tagDisplay($beerId: ID!, $first: Int) { \n tagDisplayArr: beerTags(beerId: $beerId, first: $first) { \n items { \n id \n urlName: plain \n __typename \n } \n __typename \n } \n} \n"
+               }
+
+    def _selective_operations(self, fields):
+        """Returns a ``beer`` query selecting only what ``fields`` need, and
+        the tag query if ``tags`` is one of them."""
+        selections = ['id', 'name']
+        for field in fields:
+            selection = _BEER_SELECTIONS[field]
+            if selection and selection not in selections:
+                selections.append(selection)
+        operations = [
+                 {"operationName":"beer",
+                  "variables":{"beerId":self.id},
+                  "query":"query beer($beerId: ID!) { \n info: beer(id: $beerId) { \n " + " \n ".join(selections) + " \n __typename \n } \n} \n"}]
+        if 'tags' in fields:
+            operations.append(self._tag_operation())
+        return operations
 
+    def _apply(self, results, fields=None):
+        """Sets attributes from the responses to ``_operations``.
+
+        Args:
+            results (list): the responses, in the order of ``_operations``.
+            fields (list): the attributes that were fetched, as passed to
+                ``_operations``.
+        """
         beer_data = results[0]['data']['info']
 
         if beer_data == None:
             raise rb_exceptions.PageNotFound(self.id)
 
-        alias_data = results[1]['data']['beerByAlias']
+        fields = self._selection(fields)
+        if fields is None:
+            alias_data = results[1]['data']['beerByAlias']
 
-        if alias_data != None:
-            raise rb_exceptions.AliasedBeer(self.id, alias_data['id'])
+            if alias_data != None:
+                raise rb_exceptions.AliasedBeer(self.id, alias_data['id'])
 
-        tag_data = results[2]['data']['tagDisplayArr']['items']
+            tag_data = results[2]['data']['tagDisplayArr']['items']
+            wanted = _BEER_SELECTIONS
+        else:
+            tag_data = results[1]['data']['tagDisplayArr']['items'] if 'tags' in fields else None
+            wanted = set(fields)
+            wanted.add('name')
 
         self.name = beer_data['name']
-        self.brewery = Brewery('/brewers/{0}/{1}/'.format(re.sub('[/ ]','-',beer_data['brewer']['name'].lower()),beer_data['brewer']['id']))
-        self.brewery.name = beer_data['brewer']['name']
-        self.brewed_at = None #no longer supported
-        self.overall_rating = self._format(beer_data['overallScore'])
-        self.style_rating = self._format(beer_data['styleScore'])
-        self.style = beer_data['style']['name']
-        self.style_url = "/beerstyles/{0}/{1}/".format(re.sub('/','-',self.style.lower()), beer_data['style']['id'])
-        self.img_url = "https://res.cloudinary.com/ratebeer/image/upload/w_152,h_309,c_pad,d_beer_img_default.png,f_auto/beer_{0}".format(self.id)
-        self.num_ratings = self._format(beer_data['ratingCount'])
-        self.mean_rating = self._format(beer_data['averageRating'])
-        self.weighted_avg = None # does not appear to exist anymore
-        if(beer_data['seasonal'] != 'UNKNOWN'):
-            self.seasonal = beer_data['seasonal']
-        else:
-            self.seasonal = None
-        self.ibu = self._format(beer_data['ibu'])
-        self.calories = self._format(beer_data['calories'])
-        self.abv = self._format(beer_data['abv'])
-        self.retired = beer_data['isRetired']
-        self.description = re.sub(r'\x92', '\'', beer_data['description'])
-        if tag_data:
-            self.tags = [t['urlName'] for t in tag_data]
+        if 'brewery' in wanted:
+            self.brewery = self._new_brewery('/brewers/{0}/{1}/'.format(re.sub('[/ ]','-',beer_data['brewer']['name'].lower()),beer_data['brewer']['id']))
+            self.brewery.name = beer_data['brewer']['name']
+        if 'brewed_at' in wanted:
+            self.brewed_at = None #no longer supported
+        if 'overall_rating' in wanted:
+            self.overall_rating = self._format(beer_data['overallScore'])
+        if 'style_rating' in wanted:
+            self.style_rating = self._format(beer_data['styleScore'])
+        if 'style' in wanted:
+            self.style = beer_data['style']['name']
+        if 'style_url' in wanted:
+            self.style_url = "/beerstyles/{0}/{1}/".format(re.sub('/','-',beer_data['style']['name'].lower()), beer_data['style']['id'])
+        if 'img_url' in wanted:
+            self.img_url = "https://res.cloudinary.com/ratebeer/image/upload/w_152,h_309,c_pad,d_beer_img_default.png,f_auto/beer_{0}".format(self.id)
+        if 'num_ratings' in wanted:
+            self.num_ratings = self._format(beer_data['ratingCount'])
+        if 'mean_rating' in wanted:
+            self.mean_rating = self._format(beer_data['averageRating'])
+        if 'weighted_avg' in wanted:
+            self.weighted_avg = None # does not appear to exist anymore
+        if 'seasonal' in wanted:
+            if(beer_data['seasonal'] != 'UNKNOWN'):
+                self.seasonal = beer_data['seasonal']
+            else:
+                self.seasonal = None
+        if 'ibu' in wanted:
+            self.ibu = self._format(beer_data['ibu'])
+        if 'calories' in wanted:
+            self.calories = self._format(beer_data['calories'])
+        if 'abv' in wanted:
+            self.abv = self._format(beer_data['abv'])
+        if 'retired' in wanted:
+            self.retired = beer_data['isRetired']
+        if 'description' in wanted:
+            self.description = re.sub(r'\x92', '\'', beer_data['description'])
+        if 'tags' in wanted:
+            if tag_data:
+                self.tags = [t['urlName'] for t in tag_data]
+            else:
+                self.tags = None
+
+        if fields is None or all(self._is_set(attr) for attr in _BEER_SELECTIONS):
+            self._has_fetched = True
+
+        return self
+
+    def _widen(self, fields):
+        """Makes a beer shared through an identity map also select
+        ``fields``, or everything if None."""
+        if self._has_fetched or getattr(self, '_fields', None) is None:
+            return
+        if fields is None:
+            del self._fields
         else:
-            self.tags = None
+            self._fields = self._fields + tuple(f for f in _check_fields(fields)
+                                                if f not in self._fields)
 
-        self._has_fetched = True
+    def _is_set(self, attr):
+        try:
+            object.__getattribute__(self, attr)
+        except AttributeError:
+            return False
+        return True
 
-        return self
+    def __getstate__(self):
+        """Provide state information for pickling, keeping ``fields``"""
+        state = self.__dict__
+        if self._is_set('_fields'):
+            state['_fields'] = self._fields
+        return state
 
-    def get_reviews(self, review_order="most recent"):
+    def get_reviews(self, review_order="most recent", prefetch=None):
         """Returns reviews for a specific beer.
 
         Args:
@@ -201,14 +432,70 @@ class Beer(object):
                 top raters: RateBeer.com top raters appear earlier.
                 highest score: Reviews with the highest overall score appear
                 earlier.
+            prefetch (int): the number of pages after the current one to
+                fetch concurrently in the background (default: 0, fetch one
+                page at a time as it is needed).
 
         Returns:
             A generator of dictionaries, containing the information about the review.
         """
 
-        if not self._has_fetched:
+        # Reviews only need the URL, so a beer made with ``fields`` isn't
+        # fetched any further for them.
+        if not self._has_fetched and getattr(self, '_fields', None) is None:
             self._populate()
 
+        url_flag = Beer._review_flag(review_order)
+        if prefetch:
+            pages = self._prefetch_review_pages(url_flag, prefetch)
+        else:
+            pages = self._review_pages(url_flag)
+        for reviews in pages:
+            for review in reviews:
+                yield review
+
+    def _review_page(self, url_flag, page_number):
+        soup = soup_helper._get_soup(self._review_url(url_flag, page_number), self._transport,
+                                     _REVIEWS_ONLY)
+        return _parse_reviews(soup)
+
+    def _review_pages(self, url_flag, page_number=1):
+        """Generator of the lists of reviews on each page, one page at a time."""
+        while True:
+            reviews = self._review_page(url_flag, page_number)
+            if len(reviews) < 1:
+                return
+            yield reviews
+            page_number += 1
+
+    def _prefetch_review_pages(self, url_flag, prefetch, page_number=1):
+        """Like ``_review_pages``, but keeps ``prefetch`` pages past the one
+        being consumed in flight. Pages fetched past the last one are
+        discarded."""
+        executor = ThreadPoolExecutor(max_workers=prefetch)
+        pending = deque()
+        try:
+            for _ in range(prefetch + 1):
+                pending.append(executor.submit(self._review_page, url_flag, page_number))
+                page_number += 1
+            while True:
+                reviews = pending.popleft().result()
+                if len(reviews) < 1:
+                    return
+                pending.append(executor.submit(self._review_page, url_flag, page_number))
+                page_number += 1
+                yield reviews
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _new_brewery(self, url):
+        """Returns a lazy Brewery sharing this beer's transport."""
+        return _shared(Brewery, url, self._transport)
+
+    @staticmethod
+    def _review_flag(review_order):
         review_order = review_order.lower()
         url_codes = {
             "most recent": 1,
@@ -218,23 +505,48 @@ class Beer(object):
         url_flag = url_codes.get(review_order)
         if not url_flag:
             raise ValueError("Invalid ``review_order``.")
+        return url_flag
 
-        page_number = 1
-        while True:
-            complete_url = u'{0}{1}/{2}/'.format(self.url, url_flag, page_number)
-            soup = soup_helper._get_soup(complete_url)
-            content = soup.find('div', class_='reviews-container')
-            reviews = content.find_all('div', style='padding: 0px 0px 0px 0px;')
-            if len(reviews) < 1:
-                raise StopIteration
+    def _review_url(self, url_flag, page_number):
+        return u'{0}{1}/{2}/'.format(self.url, url_flag, page_number)
 
-            for review_soup in reviews:
-                yield Review(review_soup)
 
-            page_number += 1
+def _shared(cls, url, transport, **kwargs):
+    """Returns a new ``cls`` object, or if the transport has an identity
+    map, the one already made for the same beer or brewery. A shared beer
+    asked for with other ``fields`` is widened to select those too."""
+    identities = getattr(transport, 'identities', None)
+    if identities is None:
+        return cls(url, transport=transport, **kwargs)
+    obj = identities.get(cls, url, kwargs.get('id'),
+                         lambda: cls(url, transport=transport, **kwargs))
+    if 'fields' in kwargs:
+        obj._widen(kwargs['fields'])
+    return obj
+
+
+def _check_fields(fields):
+    """Returns ``fields`` as a tuple, raising ValueError on unknown names."""
+    fields = tuple(fields)
+    for field in fields:
+        if field not in _BEER_SELECTIONS:
+            raise ValueError("Unknown Beer field {0!r}.".format(field))
+    return fields
 
 
-class Review(object):
+def _parse_reviews(soup):
+    """Returns the Review objects on a single page of reviews."""
+    return [Review._from_record(record) for record in _review_records(soup)]
+
+
+def _review_records(soup):
+    """Returns a dict of attributes per review on a single page of reviews."""
+    content = soup.find('div', class_='reviews-container')
+    return [_review_record(review_soup) for review_soup in
+            content.find_all('div', style='padding: 0px 0px 0px 0px;')]
+
+
+class Review(_Record):
     """
     Args:
         review_soup (soup): the soup of the review
@@ -251,75 +563,140 @@ class Review(object):
         user_location (string): writer's location
         user_name (string): writer's username
     """
+    __slots__ = ('appearance', 'aroma', 'palate', 'taste', 'overall', 'rating',
+                 'text', 'user_name', 'user_location', 'date')
 
     def __init__(self, review_soup):
-        # gets every second entry in a list
-        review_title_attr = review_soup.find_all('div')[1].get('title')
-
-        # some ratings may now just contain the x/5.0 rating, with no sub-ratings
-        if '<small>' in review_title_attr: 
-            raw_ratings = re.search(r'<small>(.+?)</small>', review_title_attr).group(1).split('<br />')
-            # strip html and everything else
-            for rating_text in raw_ratings:
-                parts = rating_text.split(' ')
-                # only set a rating if all of the information exists
-                if rating_text:
-                    label = parts[0]
-                    rating_int = int(parts[1][:parts[1].find("/")])
-                    setattr(
-                        self,
-                        label.lower().strip(),
-                        rating_int
-                    )
-        self.rating = float(review_soup.find_all('div')[1].text)
-
-        # get user information
-        userinfo = review_soup.next_sibling
-        self.text = userinfo.next_sibling.next_sibling.text.strip()
-        self.user_name = re.findall(r'(.*?)\xa0\(\d*?\)', userinfo.a.text)[0]
-        self.user_location = re.findall(r'-\s(.*?)\s-', userinfo.a.next_sibling)[0]
-
-        # get date it was posted
-        date = re.findall(r'-(?:\s.*?\s-)+\s(.*)', userinfo.a.next_sibling)[0]
-        self.date = datetime.strptime(date.strip(), '%b %d, %Y').date()
+        for attr, value in _review_record(review_soup).items():
+            setattr(self, attr, value)
+
+    @classmethod
+    def _from_record(cls, record):
+        """Returns a Review with the attributes of a ``_review_record``."""
+        review = cls.__new__(cls)
+        for attr, value in record.items():
+            setattr(review, attr, value)
+        return review
 
     def __str__(self):
         """Provide a nicely formatted representation"""
         return self.text
 
 
-class Brewery(object):
-    def __init__(self, url, fetch=None):
+def _review_record(review_soup):
+    """Returns a dict of attributes from the soup of a single review."""
+    record = {}
+    # gets every second entry in a list
+    review_title_attr = review_soup.find_all('div')[1].get('title')
+
+    # some ratings may now just contain the x/5.0 rating, with no sub-ratings
+    if '<small>' in review_title_attr: 
+        raw_ratings = re.search(r'<small>(.+?)</small>', review_title_attr).group(1).split('<br />')
+        # strip html and everything else
+        for rating_text in raw_ratings:
+            parts = rating_text.split(' ')
+            # only set a rating if all of the information exists
+            if rating_text:
+                label = parts[0]
+                rating_int = int(parts[1][:parts[1].find("/")])
+                record[label.lower().strip()] = rating_int
+    record['rating'] = float(review_soup.find_all('div')[1].text)
+
+    # get user information
+    userinfo = review_soup.next_sibling
+    record['text'] = userinfo.next_sibling.next_sibling.text.strip()
+    record['user_name'] = re.findall(r'(.*?)\xa0\(\d*?\)', userinfo.a.text)[0]
+    record['user_location'] = re.findall(r'-\s(.*?)\s-', userinfo.a.next_sibling)[0]
+
+    # get date it was posted
+    date = re.findall(r'-(?:\s.*?\s-)+\s(.*)', userinfo.a.next_sibling)[0]
+    record['date'] = datetime.strptime(date.strip(), '%b %d, %Y').date()
+    return record
+
+
+class BeerListing(_Record):
+    """A beer as listed in its brewery's beer table.
+
+    Unlike a ``Beer``, every attribute is always set, to None if the table
+    doesn't list it, and reading one never fetches anything. Call
+    ``hydrate`` to fetch the full ``Beer``.
+
+    Args:
+        record (dict): a row record, as returned by ``extract.brewery_beers``.
+        transport (Transport): the transport ``hydrate`` fetches through.
+
+    Returns:
+        abv (float): percentage alcohol
+        name (string): the name of the beer
+        num_ratings (int): the number of ratings
+        style_rating (int): rating of the beer within its style (out of 100)
+        url (string): the beer's url
+        weighted_avg (float): the weighted rating average (out of 5)
+    """
+    __slots__ = ('url', 'name', 'abv', 'weighted_avg', 'style_rating', 'num_ratings',
+                 '_transport')
+
+    _listed = ('url', 'name', 'abv', 'weighted_avg', 'style_rating', 'num_ratings')
+
+    def __init__(self, record, transport=None):
+        if transport is None:
+            transport = transport_helper.get_default()
+        self._transport = transport
+        for attr in BeerListing._listed:
+            setattr(self, attr, record.get(attr))
+
+    def __repr__(self):
+        """Unambiguous representation to recreate object"""
+        return "<BeerListing('{0}')>".format(self.url)
+
+    def __str__(self):
+        """Provide a nicely formatted representation"""
+        return self.name
+
+    def __setstate__(self, statedata):
+        """Reset the state after pickling"""
+        _Record.__setstate__(self, statedata)
+        self._transport = transport_helper.get_default()
+
+    def hydrate(self, fields=None):
+        """Returns the listed beer as a ``Beer``, fetched now.
+
+        Args:
+            fields (list): if given, only fetch these attributes. See
+                ``Beer``.
+        """
+        beer = self._beer(fields)
+        if not beer._has_fetched:
+            beer._populate()
+        return beer
+
+    def _beer(self, fields=None):
+        """Returns a lazy Beer holding the listed attributes."""
+        beer = _shared(Beer, self.url, self._transport, fields=fields)
+        for attr in BeerListing._listed[1:]:
+            value = getattr(self, attr)
+            if value is not None:
+                setattr(beer, attr, value)
+        return beer
+
+
+class Brewery(_LazyRecord):
+    __slots__ = ('url', 'name', 'type', 'web', 'telephone', 'street', 'city',
+                 'state', 'country', 'postal_code', '_has_fetched', '_transport')
+
+    def __init__(self, url, fetch=None, transport=None):
         """Initialize with URL and do not fetch"""
+        if transport is None:
+            transport = transport_helper.get_default()
+        self._transport = transport
         self.url = url
+        self._has_fetched = False
         if fetch is None:
             fetch = False
         if fetch:
             self._populate()
         self._has_fetched = fetch
 
-    def __getattr__(self, item):
-        """Return the value of the `attr` attribute."""
-        if item in self.__dict__.keys():
-            return self.__dict__[item]
-        elif not self._has_fetched:
-            self._populate()
-            return getattr(self, item)
-        raise AttributeError('{0} has no attribute {1}'.format(type(self), item))
-
-    def __setattr__(self, name, value):
-        """Set the `name` attribute to `value."""
-        object.__setattr__(self, name, value)
-
-    def __getstate__(self):
-        """Provide state information for pickling"""
-        result = self.__dict__.copy()
-        return result
-
-    def __setstate__(self, statedata):
-        """Reset the state after pickling"""
-        self.__dict__ = statedata
-
     def __repr__(self):
         """Unambiguous representation to recreate object"""
         return "<Brewery('{0}')>".format(self.url)
@@ -338,22 +715,17 @@ class Brewery(object):
         Returns:
             A dictionary of attributes about that brewery."""
 
-        soup = soup_helper._get_soup(self.url)
-        s_contents = soup.find_all('div', {'itemtype':'http://schema.org/LocalBusiness'})
-        if not s_contents:
-            raise rb_exceptions.PageNotFound(self.url)
+        with stats_helper._timed(self._transport.stats, 'populate_seconds', 'brewery'):
+            record = soup_helper._get_record(self.url, self._transport,
+                                             _brewery_record, extract.brewery)
+            return self._apply(record)
 
-        self.name = soup.h1.text
-        self.type = s_contents[0].find_all('div')[1].text.strip()
-        website = s_contents[0].find_all('div',{'class':'media-links'})[0].find_all('a')[0]
-        if website:
-            self.web = website['href']
-        self.telephone = Brewery._find_span(s_contents[0], 'telephone')
-        self.street = Brewery._find_span(s_contents[0], 'streetAddress')
-        self.city = Brewery._find_span(s_contents[0], 'addressLocality')
-        self.state = Brewery._find_span(s_contents[0], 'addressRegion')
-        self.country = Brewery._find_span(s_contents[0], 'addressCountry')
-        self.postal_code = Brewery._find_span(s_contents[0], 'postalCode')
+    def _apply(self, record):
+        """Sets attributes from a record of the brewery page."""
+        if record is None:
+            raise rb_exceptions.PageNotFound(self.url)
+        for attr, value in record.items():
+            setattr(self, attr, value)
         self._has_fetched = True
 
         return self
@@ -364,36 +736,83 @@ class Brewery(object):
         output = output.text.strip() if output else None
         return output
 
-    def get_beers(self):
-        """Generator that provides Beer objects for the brewery's beers"""
-        if not self._has_fetched:
+    def get_beers(self, listing=None):
+        """Generator that provides Beer objects for the brewery's beers
+
+        Args:
+            listing (bool): if True, yield a ``BeerListing`` per beer
+                instead, and don't fetch the brewery page first. Nothing but
+                the beer table is fetched (default: False).
+        """
+        if not listing and not self._has_fetched:
             self._populate()
 
+        rows = soup_helper._get_record(self._beers_url(), self._transport,
+                                       _beer_rows, extract.brewery_beers,
+                                       _BEER_TABLE_ONLY)
+        if listing:
+            for row in rows:
+                yield BeerListing(row, self._transport)
+            return
+        for beer in self._beers_from_rows(rows):
+            yield beer
+
+    def _beers_url(self):
         _id = self.url.split('/')[-2]
-        complete_url = u'/Ratings/Beer/ShowBrewerBeers.asp?BrewerID={0}'.format(_id)
-        soup = soup_helper._get_soup(complete_url)
-        soup_beer_rows = soup.find('table', id='brewer-beer-table').findAll('tr')
-
-        for row in soup_beer_rows[1:]:
-            url = row.a.get('href')
-            # Only return rows that are ratable
-            if not row.find('a',title="Rate this beer"):
-                continue
-            # Remove any whitespace characters. Rare, but possible.
-            url = re.sub(r"\s+", "", url, flags=re.UNICODE)
-            beer = Beer(url)
-            beer.name = row.a.text.strip()
-            # Add attributes from row
-            abv = row.findAll('td')[1].text
-            weighted_avg = row.findAll('td')[4].text.strip()
-            style_rating = row.findAll('td')[5].text.strip()
-            num_ratings = row.findAll('td')[6].text.strip()
-            if abv and abv != '-':
-                beer.abv = float(abv)
-            if weighted_avg:
-                beer.weighted_avg = float(weighted_avg)
-            if style_rating:
-                beer.style_rating = int(style_rating)
-            if num_ratings:
-                beer.num_ratings = int(num_ratings)
+        return u'/Ratings/Beer/ShowBrewerBeers.asp?BrewerID={0}'.format(_id)
+
+    def _new_beer(self, url):
+        """Returns a lazy Beer sharing this brewery's transport."""
+        return _shared(Beer, url, self._transport)
+
+    def _beers_from_rows(self, rows):
+        """Generator of Beer objects from the records of the brewery's beer table."""
+        for row in rows:
+            beer = self._new_beer(row['url'])
+            for attr, value in row.items():
+                if attr != 'url':
+                    setattr(beer, attr, value)
             yield beer
+
+
+def _brewery_record(soup):
+    """Returns a dict of brewery attributes from the soup of a brewery page."""
+    s_contents = soup.find_all('div', {'itemtype':'http://schema.org/LocalBusiness'})
+    if not s_contents:
+        return None
+
+    record = {}
+    record['name'] = soup.h1.text
+    record['type'] = s_contents[0].find_all('div')[1].text.strip()
+    website = s_contents[0].find_all('div',{'class':'media-links'})[0].find_all('a')[0]
+    if website:
+        record['web'] = website['href']
+    record['telephone'] = Brewery._find_span(s_contents[0], 'telephone')
+    record['street'] = Brewery._find_span(s_contents[0], 'streetAddress')
+    record['city'] = Brewery._find_span(s_contents[0], 'addressLocality')
+    record['state'] = Brewery._find_span(s_contents[0], 'addressRegion')
+    record['country'] = Brewery._find_span(s_contents[0], 'addressCountry')
+    record['postal_code'] = Brewery._find_span(s_contents[0], 'postalCode')
+    return record
+
+
+def _beer_rows(soup):
+    """Returns a record per ratable beer in the soup of a brewery's beer table.
+    See ``extract.brewery_beers``."""
+    soup_beer_rows = soup.find('table', id='brewer-beer-table').findAll('tr')
+
+    records = []
+    for row in soup_beer_rows[1:]:
+        url = row.a.get('href')
+        # Only return rows that are ratable
+        if not row.find('a',title="Rate this beer"):
+            continue
+        # Remove any whitespace characters. Rare, but possible.
+        record = {
+            'url': re.sub(r"\s+", "", url, flags=re.UNICODE),
+            'name': row.a.text.strip(),
+        }
+        # Add attributes from row
+        extract._add_row_values(record, [td.text for td in row.findAll('td')])
+        records.append(record)
+    return records
@@ -0,0 +1,214 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Parsing on a pool of processes, for crawls that are bound by parsing.
+
+BeautifulSoup holds the GIL, so threads fetching pages spend most of their
+time waiting for each other to parse. A ``Pipeline`` fetches pages on threads
+and hands the raw text to worker processes, which parse it and send back plain
+records; only the ``Brewery``, ``Beer`` and ``Review`` objects are built in
+this process::
+
+    >>> from ratebeer.pipeline import Pipeline
+    >>> with Pipeline(fetchers=16) as pipeline:
+    ...     for brewery, beers, error in pipeline.brewery_beers(urls):
+    ...         save(brewery, beers)
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from bs4 import BeautifulSoup
+
+try:
+    import cache as cache_helper
+    import extract
+    import models
+    import soup as soup_helper
+    import stats as stats_helper
+    import transport as transport_helper
+    from ratebeer import RateBeer
+except ImportError:  # No implicit package imports in py3.
+    from ratebeer import cache as cache_helper
+    from ratebeer import extract
+    from ratebeer import models
+    from ratebeer import soup as soup_helper
+    from ratebeer import stats as stats_helper
+    from ratebeer import transport as transport_helper
+    from ratebeer.ratebeer import RateBeer
+
+# What each kind of page is parsed with: the BeautifulSoup function, the part
+# of the page it reads, and the lxml extractor used with ``parser='lxml'``.
+_PARSERS = {
+    'brewery': (models._brewery_record, None, extract.brewery),
+    'brewery_beers': (models._beer_rows, models._BEER_TABLE_ONLY, extract.brewery_beers),
+    'reviews': (models._review_records, models._REVIEWS_ONLY, None),
+}
+
+
+def _parse(kind, url, text, parser):
+    """Runs in a worker process. Returns the records of a page and the
+    seconds spent parsing it."""
+    start = stats_helper._clock()
+    soup_helper._check_found(text, url)
+    from_soup, parse_only, from_text = _PARSERS[kind]
+    if parser == 'lxml':
+        records = from_text(text)
+    else:
+        records = from_soup(BeautifulSoup(text, "lxml", parse_only=parse_only))
+    return records, stats_helper._clock() - start
+
+
+class Pipeline(object):
+    """Fetches pages on a pool of threads and parses them on a pool of
+    processes.
+
+    Results are yielded in the order they were asked for, as
+    ``(..., error)`` tuples where ``error`` is None or the exception that
+    failed the item, so one bad page doesn't end the crawl.
+
+    Args:
+        rb (RateBeer): the client to fetch with. By default one is created
+            with a connection pool as large as ``fetchers``.
+        fetchers (int): the number of pages fetched concurrently (default: 8).
+        processes (int): the number of parsing processes (default: one per
+            CPU).
+    """
+
+    def __init__(self, rb=None, fetchers=None, processes=None):
+        if fetchers is None:
+            fetchers = 8
+        if rb is None:
+            rb = RateBeer(transport_helper.Transport(pool_maxsize=fetchers))
+        self.rb = rb
+        self.fetchers = fetchers
+        self._processes = ProcessPoolExecutor(max_workers=processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Stops the parsing processes."""
+        self._processes.shutdown()
+
+    def breweries(self, urls):
+        """Generator of a populated ``Brewery`` per url, as
+        ``(brewery, error)`` tuples."""
+        for url, (brewery, error) in self._each(self._brewery, urls):
+            if error is not None:
+                brewery = self.rb._new_brewery(url)
+            yield brewery, error
+
+    def brewery_beers(self, urls):
+        """Generator of each brewery and its beers, as
+        ``(brewery, beers, error)`` tuples.
+
+        The brewery is populated; the beers hold what the brewery's beer
+        table lists and fetch the rest when it is read.
+        """
+        for url, (result, error) in self._each(self._brewery_and_beers, urls):
+            if error is not None:
+                result = self.rb._new_brewery(url), []
+            yield result + (error,)
+
+    def reviews(self, beer, review_order="most recent"):
+        """Generator of a beer's reviews, like ``Beer.get_reviews``, with
+        ``fetchers`` pages fetched and parsed ahead of the one being read."""
+        if not beer._has_fetched:
+            beer._populate()
+        url_flag = models.Beer._review_flag(review_order)
+        executor = ThreadPoolExecutor(max_workers=self.fetchers)
+        pending = deque()
+        page_number = 1
+        try:
+            while True:
+                while len(pending) < self.fetchers:
+                    pending.append(executor.submit(
+                        self._records, 'reviews', beer._review_url(url_flag, page_number)))
+                    page_number += 1
+                records = pending.popleft().result()
+                if not records:
+                    return
+                for record in records:
+                    yield models.Review._from_record(record)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _brewery(self, url):
+        brewery = self.rb._new_brewery(url)
+        brewery._apply(self._records('brewery', url))
+        if self.rb.offline_index is not None:
+            self.rb.offline_index.add(brewery)
+        return brewery
+
+    def _brewery_and_beers(self, url):
+        brewery = self._brewery(url)
+        rows = self._records('brewery_beers', brewery._beers_url())
+        return brewery, list(brewery._beers_from_rows(rows))
+
+    def _each(self, func, items):
+        """Generator of ``(item, (func(item), error))`` for each item, in
+        order, with up to twice ``fetchers`` items in flight."""
+        executor = ThreadPoolExecutor(max_workers=self.fetchers)
+        pending = deque()
+        try:
+            for item in items:
+                pending.append((item, executor.submit(func, item)))
+                if len(pending) >= self.fetchers * 2:
+                    yield _outcome(*pending.popleft())
+            while pending:
+                yield _outcome(*pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _records(self, kind, url):
+        """Fetches a page and returns its records, parsed in a worker process.
+
+        Blocks until the records are back, so is called from the fetching
+        threads, which wait without holding the GIL.
+        """
+        transport = self.rb.transport
+        url = soup_helper._strip_base(url)
+        text = transport.get_text(soup_helper._BASE_URL + url)
+        parser = 'lxml' if transport.parser == 'lxml' and _PARSERS[kind][2] else 'soup'
+        records, seconds = self._processes.submit(_parse, kind, url, text, parser).result()
+        if transport.stats is not None:
+            transport.stats._observe('parse_seconds',
+                                     (cache_helper._endpoint(url) or 'other', parser), seconds)
+        return records
+
+
+def _outcome(item, future):
+    try:
+        return item, (future.result(), None)
+    except Exception as e:
+        return item, (None, e)
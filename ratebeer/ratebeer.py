@@ -24,17 +24,43 @@
 # For more information, please refer to <http://unlicense.org/>
 
 import re
-import requests
 import string
 import json
-from bs4 import BeautifulSoup
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
 
 try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import extract
+    import identity as identity_helper
+    import index as index_helper
     import models
+    import rb_exceptions
     import soup as soup_helper
+    import transport as transport_helper
 except ImportError as e:  # No implicit package imports in py3.
+    from ratebeer import extract
+    from ratebeer import identity as identity_helper
+    from ratebeer import index as index_helper
     from ratebeer import models
+    from ratebeer import rb_exceptions
     from ratebeer import soup as soup_helper
+    from ratebeer import transport as transport_helper
+# Only the parts of each page that are read are parsed.
+_STYLE_MENU_ONLY = SoupStrainer('select', id='StyleMenu')
+_TABLE_ONLY = SoupStrainer('table')
+
+# Every ``(sort_type, sort_order)`` a style listing can be fetched in.
+_STYLE_SORTS = [(sort_type, sort_order)
+                for sort_type in ('score', 'count', 'abv')
+                for sort_order in ('descending', 'ascending')]
+
 
 class RateBeer(object):
     """
@@ -78,59 +104,399 @@ class RateBeer(object):
              'url': '/beer/summit-extra-pale-ale/7344/',
              'weighted_avg': 3.27}
 
+    Every request made by the client, and by the ``Beer`` and ``Brewery``
+    objects it returns, goes through one pooled ``Transport`` so connections
+    are kept alive between fetches:
+
+    .. code:: python
+
+        >>> from ratebeer.transport import Transport
+        >>> rb = ratebeer.RateBeer(Transport(pool_maxsize=20, timeout=(3, 30)))
+
+    Args:
+        transport (Transport): the transport to fetch through. A new one with
+            default pool settings is created if not provided.
+        offline_index (Index or string): a ``ratebeer.index.Index``, or the
+            path of one, to answer ``get_beer`` and ``get_brewery`` from
+            when it can, and ``search(query, offline=True)``. Beers and
+            breweries fetched through this client are stored in it.
+        identity_map (bool or IdentityMap): if True, or a
+            ``ratebeer.identity.IdentityMap``, every beer and brewery the
+            client returns or links to is one shared object, which fetches
+            at most once and picks up the attributes of each listing it
+            shows up in. Kept on the transport, which the objects share.
+
     See the full README at https://github.com/alilja/ratebeer
     """
 
-    def search(self, query):
+    _beer_class = models.Beer
+    _brewery_class = models.Brewery
+
+    offline_index = None
+
+    def __init__(self, transport=None, offline_index=None, identity_map=None):
+        if transport is None:
+            transport = transport_helper.Transport()
+        self.transport = transport
+        if offline_index is not None and not isinstance(offline_index, index_helper.Index):
+            offline_index = index_helper.Index(offline_index)
+        self.offline_index = offline_index
+        self._set_identity_map(identity_map)
+
+    def _set_identity_map(self, identity_map):
+        if identity_map is True:
+            identity_map = identity_helper.IdentityMap()
+        if identity_map is not None and identity_map is not False:
+            self.transport.identities = identity_map
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the client's pooled connections."""
+        self.transport.close()
+
+    @property
+    def identities(self):
+        """The client's ``IdentityMap``, or None if it has none."""
+        return self.transport.identities
+
+    def _new_beer(self, url, **kwargs):
+        return models._shared(self._beer_class, url, self.transport, **kwargs)
+
+    def _new_brewery(self, url):
+        return models._shared(self._brewery_class, url, self.transport)
+
+    @property
+    def stats(self):
+        """The ``Stats`` of the client's transport, or None if it has none."""
+        return self.transport.stats
+
+    def search(self, query, offline=None):
         """Returns a list of beers and breweries that matched the search query.
 
         Args:
             query (string): The text of the search.
+            offline (bool): if True, search the ``offline_index`` instead of
+                RateBeer.com (default: False).
 
         Returns:
             A dictionary containing two lists, ``breweries`` and ``beers``.
             Each list contains a dictionary of attributes of that brewery or
             beer.
+
+        With an ``offline_index``, the beers found online are stored in it.
         """
+        if offline:
+            if self.offline_index is None:
+                raise ValueError("offline search needs an offline_index.")
+            return self.offline_index.search(query, transport=self.transport)
 
-        data = {
-                 "query":"query beerSearch($query: String, $order: SearchOrder, $first: Int, $after: ID) { searchResultsArr: beerSearch(query: $query, order: $order, first: $first, after: $after) { totalCount last items { beer { id name imageUrl overallScore ratingCount __typename } review { id score __typename } __typename   }   __typename } }", 
-                 "variables": {"query":query, "order":"MATCH", "first":20},
-                 "operationName":"beerSearch"
-                }
+        response = self.transport.graphql(self._search_operation(query))
+
+        try:
+            search_results = json.loads(response)
+        except:
+            raise rb_exceptions.JSONParseException(query)
 
-        # options = requests.options("https://beta.ratebeer.com/v1/api/graphql/")
+        results = self._parse_search(search_results)
+        if self.offline_index is not None:
+            self.offline_index.add_all(results['beers'])
+        return results
 
-        request = requests.post(
-            "https://beta.ratebeer.com/v1/api/graphql/"
-           ,data=json.dumps(data)
-           ,headers={"content-type": "application/json"}
-        )
-        output = {"breweries": [], "beers": []}
+    def iter_search(self, query, page_size=None, max_results=None, prefetch=None):
+        """Generator of every beer matching the search query, a page at a time.
 
+        Follows the search cursor past the first page that ``search``
+        returns, fetching each page only as the previous one runs out.
+
+        Args:
+            query (string): The text of the search.
+            page_size (int): the number of results per request (default: 20).
+            max_results (int): stop after this many beers (default: None,
+                all of them).
+            prefetch (bool): if True, fetch the next page in the background
+                while the current one is consumed (default: False).
+
+        Returns:
+            A generator of ``Beer`` objects, in search order.
+        """
+        if page_size is None:
+            page_size = 20
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
         try:
-            search_results = json.loads(request.text)
-        except:
+            count = 0
+            first = self._page_size(page_size, max_results, 0)
+            if not first:
+                return
+            page = self._search_page(query, first)
+            while True:
+                beers, after = page
+                beers = beers[:None if max_results is None else max_results - count]
+                remaining = self._page_size(page_size, max_results, count + len(beers))
+                upcoming = None
+                if executor is not None and after is not None and remaining:
+                    upcoming = executor.submit(self._search_page, query, remaining, after)
+                for beer in beers:
+                    yield beer
+                count += len(beers)
+                if after is None or not beers or not remaining:
+                    return
+                if upcoming is not None:
+                    page = upcoming.result()
+                else:
+                    page = self._search_page(query, remaining, after)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    @staticmethod
+    def _page_size(page_size, max_results, count):
+        """Returns how many results to ask for next, or 0 to stop."""
+        if max_results is None:
+            return page_size
+        return max(0, min(page_size, max_results - count))
+
+    def _search_page(self, query, first, after=None):
+        """Returns one page of beers and the cursor of the next page."""
+        response = self.transport.graphql(self._search_operation(query, first, after))
+        try:
+            search_results = json.loads(response)
+        except ValueError:
             raise rb_exceptions.JSONParseException(query)
+        return self._parse_search_page(search_results)
+
+    @staticmethod
+    def _search_operation(query, first=None, after=None):
+        if first is None:
+            first = 20
+        variables = {"query":query, "order":"MATCH", "first":first}
+        if after is not None:
+            variables["after"] = after
+        return {
+                 "query":"query beerSearch($query: String, $order: SearchOrder, $first: Int, $after: ID) { searchResultsArr: beerSearch(query: $query, order: $order, first: $first, after: $after) { totalCount last items { beer { id name imageUrl overallScore ratingCount __typename } review { id score __typename } __typename   }   __typename } }", 
+                 "variables": variables,
+                 "operationName":"beerSearch"
+                }
 
-        for result in search_results['data']['searchResultsArr']['items']:
+    def _parse_search(self, search_results):
+        output = {"breweries": [], "beers": []}
+        output['beers'] = self._parse_search_page(search_results)[0]
+        return output
+
+    def _parse_search_page(self, search_results):
+        """Returns the beers of a search response and its ``last`` cursor."""
+        results = search_results['data']['searchResultsArr']
+        beers = []
+        for result in results['items']:
             if 'beer' in result:
                 beer_data = result['beer']
                 # double check this...
                 url = '/beer/{0}/{1}/'.format(beer_data['name'].replace(' ', '-').lower(), beer_data['id'])
-                beer = models.Beer(url, id=beer_data['id'])
+                beer = self._new_beer(url, id=beer_data['id'])
 
                 beer.name = beer_data['name']
                 beer.overall_rating = beer_data['overallScore']
                 beer.num_ratings = beer_data['ratingCount']
-            output['beers'].append(beer)
-        return output
+                beers.append(beer)
+        return beers, results.get('last')
 
-    def get_beer(self, url, fetch=None):
-        """Returns a Beer object for the requested URL"""
+    def get_beer(self, url, fetch=None, fields=None):
+        """Returns a Beer object for the requested URL.
+
+        Args:
+            url (string): the beer's URL.
+            fetch (bool): if True, fetch the beer now (default: False).
+            fields (list): if given, only fetch these attributes. See
+                ``Beer``.
+        """
         if fetch is None:
             fetch = False
-        return models.Beer(url, fetch)
+        if self.offline_index is not None:
+            beer = self.offline_index.get_beer(url, self.transport)
+            if beer is not None:
+                return beer
+        beer = self._new_beer(url, fields=fields)
+        if fetch and not beer._has_fetched:
+            beer._populate()
+        if fetch and self.offline_index is not None:
+            self.offline_index.add(beer)
+        return beer
+
+    def get_beers(self, ids, batch_size=None, fields=None):
+        """Fetches many beers, packing several into each GraphQL request.
+
+        Args:
+            ids (list): beer ids, or beer URLs like
+                "/beer/deschutes-inversion-ipa/55610/".
+            batch_size (int): the number of beers fetched per request
+                (default: 20).
+            fields (list): if given, only fetch these attributes. See
+                ``Beer``.
+
+        Returns:
+            A generator of ``(beer, error)`` tuples in the order of ``ids``.
+            ``error`` is None if the beer was fetched, otherwise the
+            ``PageNotFound``, ``AliasedBeer`` or ``JSONParseException`` for
+            that beer; the rest of its batch is unaffected.
+        """
+        for beers in self._beer_batches(ids, batch_size, fields):
+            errors = self._fetch_beers(beers)
+            for beer in beers:
+                yield beer, errors.get(id(beer))
+
+    def _fetch_beers(self, beers):
+        """Fetches the beers that aren't fetched yet in one request.
+
+        Returns a dict of the error of each beer that failed, keyed on
+        ``id(beer)``.
+        """
+        # Beers shared through the identity map may be fetched already.
+        pending = [beer for beer in beers if not beer._has_fetched]
+        errors = {}
+        if not pending:
+            return errors
+        operations = [op for beer in pending for op in beer._operations()]
+        try:
+            results = json.loads(self.transport.graphql(operations))
+        except ValueError:
+            results = None
+        for beer, error in RateBeer._apply_batch(pending, results):
+            if error is None and self.offline_index is not None:
+                self.offline_index.add(beer)
+            if error is not None:
+                errors[id(beer)] = error
+        return errors
+
+    def _beer_batches(self, ids, batch_size=None, fields=None):
+        if batch_size is None:
+            batch_size = 20
+        batch = []
+        for ident in ids:
+            if '/' in str(ident):
+                batch.append(self._new_beer(ident, fields=fields))
+            else:
+                batch.append(self._new_beer(None, id=str(ident), fields=fields))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def hydrate(self, objects, concurrency=None, batch_size=None, ordered=None):
+        """Fetches a collection of lazy beers and breweries concurrently.
+
+        Beers are fetched ``batch_size`` to a GraphQL request, as in
+        ``get_beers``, and breweries a page each, with ``concurrency``
+        requests in flight.
+
+        Args:
+            objects (iterable): ``Beer``, ``Brewery`` and ``BeerListing``
+                objects, such as those from ``search``, ``beer_style``,
+                ``brewers_by_alpha`` and ``Brewery.get_beers``. Any that are
+                already fetched are passed through.
+            concurrency (int): the number of requests in flight (default: 8).
+            batch_size (int): the number of beers fetched per request
+                (default: 20).
+            ordered (bool): if True, yield in the order of ``objects``;
+                otherwise as each is fetched (default: False).
+
+        Returns:
+            A generator of ``(model, error)`` tuples. A ``BeerListing`` is
+            replaced by its ``Beer``. ``error`` is None if the model was
+            fetched, otherwise the exception that failed it.
+        """
+        if concurrency is None:
+            concurrency = 8
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        running = set()
+        done = {}
+        position = [0]
+        try:
+            for job in self._hydrate_jobs(objects, batch_size):
+                if len(running) >= concurrency * 2:
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    for pair in _hydrated(_results(finished), done, position, ordered):
+                        yield pair
+                running.add(executor.submit(self._hydrate_job, *job))
+            while running:
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for pair in _hydrated(_results(finished), done, position, ordered):
+                    yield pair
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _hydrate_jobs(self, objects, batch_size=None):
+        """Groups objects into ``(kind, items)`` jobs, where ``items`` are
+        ``(index, model)`` tuples: a batch of beers, or a single brewery."""
+        if batch_size is None:
+            batch_size = 20
+        batch = []
+        for index, model in enumerate(objects):
+            if isinstance(model, models.BeerListing):
+                model = model._beer()
+            if isinstance(model, models.Brewery):
+                yield 'brewery', [(index, model)]
+                continue
+            batch.append((index, model))
+            if len(batch) == batch_size:
+                yield 'beers', batch
+                batch = []
+        if batch:
+            yield 'beers', batch
+
+    def _hydrate_job(self, kind, items):
+        """Fetches a job from ``_hydrate_jobs``. Returns ``(index, model,
+        error)`` for each of its items."""
+        if kind == 'beers':
+            try:
+                errors = self._fetch_beers([model for _, model in items])
+            except Exception as e:
+                errors = dict((id(model), e) for _, model in items)
+            return [(index, model, errors.get(id(model))) for index, model in items]
+        (index, brewery), = items
+        try:
+            if not brewery._has_fetched:
+                brewery._populate()
+                if self.offline_index is not None:
+                    self.offline_index.add(brewery)
+        except Exception as e:
+            return [(index, brewery, e)]
+        return [(index, brewery, None)]
+
+    @staticmethod
+    def _apply_batch(beers, results):
+        """Generator of ``(beer, error)`` for the response to a batch.
+
+        A response that isn't a list of one result per operation, such as a
+        top-level ``{"errors": ...}``, fails every beer of the batch with a
+        ``JSONParseException``; a malformed result only fails its own beer.
+        """
+        counts = [len(beer._operations()) for beer in beers]
+        if not isinstance(results, list) or len(results) != sum(counts):
+            results = None
+        offset = 0
+        for beer, count in zip(beers, counts):
+            if results is None:
+                yield beer, rb_exceptions.JSONParseException(beer.id)
+                continue
+            entries = results[offset:offset + count]
+            offset += count
+            try:
+                beer._apply(entries)
+            except (rb_exceptions.PageNotFound, rb_exceptions.AliasedBeer) as e:
+                yield beer, e
+            except (KeyError, TypeError, IndexError, AttributeError):
+                yield beer, rb_exceptions.JSONParseException(beer.id)
+            else:
+                if beer.url is None:
+                    beer.url = '/beer/{0}/{1}/'.format(beer.name.replace(' ', '-').lower(), beer.id)
+                yield beer, None
 
     def beer(self, url):
         """Returns a dict with beer information for the requested URL"""
@@ -140,7 +506,16 @@ class RateBeer(object):
         """Returns a Brewery object for the requested URL"""
         if fetch is None:
             fetch = False
-        return models.Brewery(url, fetch)
+        if self.offline_index is not None:
+            brewery = self.offline_index.get_brewery(url, self.transport)
+            if brewery is not None:
+                return brewery
+        brewery = self._new_brewery(url)
+        if fetch and not brewery._has_fetched:
+            brewery._populate()
+        if fetch and self.offline_index is not None:
+            self.offline_index.add(brewery)
+        return brewery
 
     def brewery(self, url):
         """Returns a dict with brewery information for the requested URL"""
@@ -153,8 +528,12 @@ class RateBeer(object):
             A dictionary, with beer styles strings for keys and integer ids
             for values.
         """
+        return soup_helper._get_record("/top/", self.transport, RateBeer._parse_style_list,
+                                       extract.style_list, _STYLE_MENU_ONLY)
+
+    @staticmethod
+    def _parse_style_list(soup):
         styles = {}
-        soup = soup_helper._get_soup("/top/")
         for item in [i for i in soup.find('select', id="StyleMenu").find_all('option') if i.get('name')]:
             styles[item.text.strip()] = int(item.get('value'))
         return styles
@@ -173,6 +552,73 @@ class RateBeer(object):
         Returns:
             A list of generator of beers.
         """
+        soup = soup_helper._get_soup(RateBeer._beer_style_url(ident, sort_type, sort_order),
+                                     self.transport, _TABLE_ONLY)
+        for beer in self._parse_beer_style(soup):
+            yield beer
+
+    def crawl_styles(self, styles=None, sorts=None, workers=None):
+        """Generator of the beers of many style listings, fetched concurrently.
+
+        Each beer is yielded once, as soon as the first listing it is in
+        arrives, and has two extra attributes: ``style_id``, and
+        ``style_ranks``, a dict of its 1-based rank in each listing, keyed on
+        ``(sort_type, sort_order)``. Ranks from listings that arrive later are
+        added to the beer already yielded, so they are complete once the
+        generator is exhausted.
+
+        Args:
+            styles (iterable): the style ids to fetch (default: every style
+                in ``beer_style_list()``).
+            sorts (iterable): the ``(sort_type, sort_order)`` tuples to fetch
+                each style in, as taken by ``beer_style`` (default: all six).
+            workers (int): the number of listings fetched concurrently
+                (default: 8).
+
+        Returns:
+            A generator of beers.
+        """
+        if styles is None:
+            styles = sorted(self.beer_style_list().values())
+        if sorts is None:
+            sorts = _STYLE_SORTS
+        if workers is None:
+            workers = 8
+        listings = [(ident, sort) for ident in styles for sort in sorts]
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {}
+        try:
+            for ident, sort in listings:
+                futures[executor.submit(self._style_listing, ident, sort)] = (ident, sort)
+            seen = {}
+            for future in as_completed(futures):
+                ident, sort = futures.pop(future)
+                for beer in self._rank_styles(seen, ident, sort, future.result()):
+                    yield beer
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _style_listing(self, ident, sort):
+        return list(self.beer_style(ident, *sort))
+
+    @staticmethod
+    def _rank_styles(seen, ident, sort, beers):
+        """Records each beer's rank in a listing in ``seen``, keyed on url,
+        and returns the beers not seen before."""
+        new = []
+        for rank, beer in enumerate(beers, 1):
+            if beer.url not in seen:
+                beer.style_id = ident
+                beer.style_ranks = {}
+                seen[beer.url] = beer
+                new.append(beer)
+            seen[beer.url].style_ranks[tuple(sort)] = rank
+        return new
+
+    @staticmethod
+    def _beer_style_url(ident, sort_type=None, sort_order=None):
         if sort_type is None:
             sort_type = 'score'
         if sort_order is None:
@@ -181,14 +627,15 @@ class RateBeer(object):
         sort_order = sort_order.lower()
         so = {'score': 0, 'count': 1, 'abv': 2}.get(sort_type)
         o = {'descending': 0, 'ascending': 1}.get(sort_order)
+        return '/ajax/top-beer.asp?s={}&so={}&o={}'.format(ident, so, o)
 
-        soup = soup_helper._get_soup('/ajax/top-beer.asp?s={}&so={}&o={}'.format(ident, so, o))
+    def _parse_beer_style(self, soup):
         rows = iter(soup.table.find_all('tr'))
         next(rows)  # Get rid of the header
         for row in rows:
             data = row.find_all('td')
             link = data[1].a
-            dataout = models.Beer(link.get('href'))
+            dataout = self._new_beer(link.get('href'))
             dataout.name = link.text
             yield dataout
 
@@ -204,19 +651,137 @@ class RateBeer(object):
             with the ``brewery`` method.
         """
 
+        text = self.transport.post_text(RateBeer._brewers_url(letter))
+        return self._parse_brewers(BeautifulSoup(text, "lxml"))
+
+    def iter_brewers_by_alpha(self, letter):
+        """Generator of the breweries that start with the provided letter,
+        like ``brewers_by_alpha``, yielding each as soon as it is read.
+
+        The page is parsed incrementally with lxml as it downloads, and
+        what has been read is discarded, so the first breweries of a large
+        letter arrive long before the page is complete.
+
+        Args:
+            letter (string): a single letter to search.
+        """
+        parser = etree.HTMLPullParser(events=('end',), tag='a')
+        for chunk in self.transport.post_chunks(RateBeer._brewers_url(letter)):
+            parser.feed(chunk)
+            for brewery in self._brewers_from_events(parser.read_events()):
+                yield brewery
+        parser.close()
+        for brewery in self._brewers_from_events(parser.read_events()):
+            yield brewery
+
+    def _brewers_from_events(self, events):
+        for _, element in events:
+            url = element.get('href')
+            # Drop what has been read, so memory stays flat on large letters.
+            element.clear()
+            node = element
+            while node is not None:
+                while node.getprevious() is not None:
+                    del node.getparent()[0]
+                node = node.getparent()
+            if url and '/brewers/' in url:
+                yield self._new_brewery(url)
+
+    def all_brewers(self, letters=None, workers=None):
+        """Generator of the breweries of every letter, streamed from
+        ``workers`` letters at once, in the order they are read.
+
+        Args:
+            letters (list): the letters to read (default: A-Z and 0-9).
+            workers (int): the number of letters fetched concurrently
+                (default: 4).
+        """
+        if letters is None:
+            letters = list(string.ascii_uppercase) + ['0-9']
+        if workers is None:
+            workers = 4
+        for letter in letters:
+            RateBeer._brewers_url(letter)  # Fail early on a bad letter.
+        # Bounded, so producers wait for a slow consumer instead of reading
+        # whole letters into memory.
+        found = queue.Queue(maxsize=workers * 64)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = [executor.submit(self._stream_letter, letter, found, stop)
+                   for letter in letters]
+        try:
+            remaining = len(futures)
+            while remaining:
+                item = found.get()
+                if item is None:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stop.set()
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _stream_letter(self, letter, found, stop):
+        """Puts the breweries of a letter on ``found``, then None, or the
+        exception that stopped it. Gives up once ``stop`` is set."""
+        try:
+            for brewery in self.iter_brewers_by_alpha(letter):
+                if not _put(found, brewery, stop):
+                    return
+        except Exception as e:
+            _put(found, e, stop)
+        else:
+            _put(found, None, stop)
+
+    @staticmethod
+    def _brewers_url(letter):
         if letter not in string.ascii_uppercase and letter != '0-9':
             raise ValueError("Please only provide a single letter.")
+        return soup_helper._BASE_URL + "/browsebrewers-" + letter + ".htm"
 
-        request = requests.post(
-            soup_helper._BASE_URL + "/browsebrewers-" + letter + ".htm"
-        )
-        soup = BeautifulSoup(request.text, "lxml")
+    def _parse_brewers(self, soup):
         breweries = []
 
-        for entry in soup.select('a[href*=/brewers/]'):
+        for entry in soup.select('a[href*="/brewers/"]'):
             url = entry.get('href')
-            brewer = models.Brewery(url)
+            brewer = self._new_brewery(url)
 
             breweries.append(brewer)
 
         return breweries
+
+
+def _put(found, item, stop):
+    """Puts ``item`` on the bounded queue ``found``, waiting for room unless
+    ``stop`` is set. Returns whether it was put."""
+    while not stop.is_set():
+        try:
+            found.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _results(finished):
+    return [result for future in finished for result in future.result()]
+
+
+def _hydrated(results, done, position, ordered):
+    """Returns the ``(model, error)`` tuples of finished hydrate jobs'
+    ``(index, model, error)`` results that are ready to yield. With
+    ``ordered``, results are held in ``done`` until every earlier one is in;
+    ``position`` is the next index due."""
+    if not ordered:
+        return [(model, error) for _, model, error in results]
+    for index, model, error in results:
+        done[index] = model, error
+    ready = []
+    while position[0] in done:
+        ready.append(done.pop(position[0]))
+        position[0] += 1
+    return ready
@@ -23,24 +23,95 @@
 #
 # For more information, please refer to <http://unlicense.org/>
 
-import requests
-
 from bs4 import BeautifulSoup
 
 try:
+    import cache as cache_helper
     import rb_exceptions
+    import stats as stats_helper
+    import transport as transport_helper
 except ImportError:  # No implicit package imports in py3.
+    from ratebeer import cache as cache_helper
     from ratebeer import rb_exceptions
+    from ratebeer import stats as stats_helper
+    from ratebeer import transport as transport_helper
 
 _BASE_URL = "https://www.ratebeer.com"
 
+def _get_soup(url, transport=None, parse_only=None):
+    """Fetches and parses a page.
+
+    Args:
+        url (string): the page, relative to RateBeer.com.
+        transport (Transport): the transport to fetch through.
+        parse_only (SoupStrainer): if given, only the matching parts of the
+            page are parsed.
+    """
+    if transport is None:
+        transport = transport_helper.get_default()
+    url = _strip_base(url)
+    return transport._coalesced(('soup', url, parse_only), cache_helper._endpoint(url),
+                                _load_soup, url, transport, parse_only)
+
+
+def _load_soup(url, transport, parse_only):
+    text = transport.get_text(_BASE_URL + url)
+    if transport.cache is None:
+        with _timed_parse(transport, url, 'soup'):
+            return _make_soup(text, url, parse_only)
+
+    key = (url, len(text), hash(text), parse_only)
+    soup = transport._from_parsed(key)
+    if soup is None:
+        with _timed_parse(transport, url, 'soup'):
+            soup = _make_soup(text, url, parse_only)
+        transport._to_parsed(key, soup)
+    return soup
+
+
+def _get_record(url, transport, from_soup, from_text, parse_only=None):
+    """Fetches a page and extracts plain records from it.
+
+    Uses ``from_text``, one of the lxml extractors in ``extract``, on the page
+    text if the transport's ``parser`` is "lxml", and ``from_soup`` on the
+    (``parse_only`` limited) soup otherwise.
+    """
+    if transport is None:
+        transport = transport_helper.get_default()
+    if transport.parser != 'lxml':
+        return from_soup(_get_soup(url, transport, parse_only))
+    url = _strip_base(url)
+    return transport._coalesced(('lxml', url, from_text), cache_helper._endpoint(url),
+                                _load_record, url, transport, from_text)
+
 
-def _get_soup(url):
+def _load_record(url, transport, from_text):
+    text = transport.get_text(_BASE_URL + url)
+    with _timed_parse(transport, url, 'lxml'):
+        _check_found(text, url)
+        return from_text(text)
+
+
+def _timed_parse(transport, url, parser):
+    """Records the time spent in the block as parsing ``url``."""
+    return stats_helper._timed(transport.stats, 'parse_seconds',
+                               cache_helper._endpoint(url) or 'other', parser)
+
+
+def _strip_base(url):
+    """Returns the site-relative part of ``url``."""
     if _BASE_URL in url:
-        url.replace(_BASE_URL, '')
-    req = requests.get(_BASE_URL + url, allow_redirects=True)
-    if '<meta http-equiv="Content-Type" content="text/html;" charset="utf-8">' in req.text:
-        req.encoding = 'utf-8'
-    if "ratebeer robot oops" in req.text.lower():
+        url = url.replace(_BASE_URL, '')
+    return url
+
+
+def _check_found(text, url):
+    """Raises ``PageNotFound`` if ``text`` is RateBeer's error page."""
+    if "ratebeer robot oops" in text.lower():
         raise rb_exceptions.PageNotFound(url)
-    return BeautifulSoup(req.text, "lxml")
+
+
+def _make_soup(text, url, parse_only=None):
+    """Parses page text, raising ``PageNotFound`` on RateBeer's error page."""
+    _check_found(text, url)
+    return BeautifulSoup(text, "lxml", parse_only=parse_only)
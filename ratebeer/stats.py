@@ -0,0 +1,203 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Request, cache, parse and populate metrics for a transport::
+
+    >>> from ratebeer import RateBeer, Transport
+    >>> from ratebeer.stats import Stats
+    >>> rb = RateBeer(Transport(stats=Stats()))
+    >>> rb.get_beer('/beer/deschutes-inversion-ipa/55610/', True)
+    >>> print(rb.stats.prometheus())
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+
+_clock = getattr(time, 'monotonic', time.time)
+
+# Upper bounds, in seconds, of the histogram buckets.
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name: (type, help, label names)
+_METRICS = {
+    'requests_total': ('counter', 'HTTP requests sent, retries included.',
+                       ('endpoint', 'method', 'status')),
+    'response_bytes_total': ('counter', 'Bytes of response bodies received.',
+                             ('endpoint',)),
+    'cache_total': ('counter', 'Cache lookups by result: hit, miss or revalidated.',
+                    ('endpoint', 'result')),
+    'request_seconds': ('histogram', 'Seconds from sending a request to reading its body.',
+                        ('endpoint',)),
+    'parse_seconds': ('histogram', 'Seconds spent parsing fetched pages.',
+                      ('endpoint', 'parser')),
+    'coalesced_total': ('counter', 'Fetches that shared one already in flight instead of sending a request.',
+                        ('endpoint',)),
+    'populate_seconds': ('histogram', 'Seconds spent in _populate, fetching included.',
+                         ('model',)),
+}
+
+
+class Stats(object):
+    """Collects metrics from every request made through a transport.
+
+    Counters and histograms are kept per endpoint: the page kinds used for
+    cache TTLs ("brewery", "reviews", ...) and the GraphQL operation names
+    ("beer", "beerSearch", ...). Every measurement is also passed to the
+    callbacks as an event dict, such as ``{'metric': 'request_seconds',
+    'endpoint': 'beer', 'value': 0.21}``, to forward to other monitoring.
+
+    Args:
+        callbacks (list): callables taking one event dict (default: none).
+        buckets (tuple): the upper bounds, in seconds, of the histogram
+            buckets.
+    """
+
+    def __init__(self, callbacks=None, buckets=None):
+        if callbacks is None:
+            callbacks = []
+        if buckets is None:
+            buckets = _BUCKETS
+        self.callbacks = list(callbacks)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def add_callback(self, callback):
+        """Calls ``callback(event)`` for every measurement from now on."""
+        self.callbacks.append(callback)
+
+    def reset(self):
+        """Forgets everything measured so far."""
+        with self._lock:
+            self._values = dict((name, {}) for name in _METRICS)
+
+    def _inc(self, name, labels, amount=1):
+        with self._lock:
+            values = self._values[name]
+            values[labels] = values.get(labels, 0) + amount
+        self._emit(name, labels, amount)
+
+    def _observe(self, name, labels, seconds):
+        with self._lock:
+            values = self._values[name]
+            if labels not in values:
+                values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = values[labels]
+            counts[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            counts[1] += seconds
+        self._emit(name, labels, seconds)
+
+    def _emit(self, name, labels, value):
+        if not self.callbacks:
+            return
+        event = dict(zip(_METRICS[name][2], labels))
+        event['metric'] = name
+        event['value'] = value
+        for callback in self.callbacks:
+            callback(event)
+
+    def _request(self, endpoint, method, status, seconds, size):
+        """Records one request. ``status`` is "error" if none was received."""
+        endpoint = endpoint or 'other'
+        self._inc('requests_total', (endpoint, method, str(status)))
+        self._observe('request_seconds', (endpoint,), seconds)
+        if size:
+            self._inc('response_bytes_total', (endpoint,), size)
+
+    def _cache(self, endpoint, result):
+        self._inc('cache_total', (endpoint or 'other', result))
+
+    def snapshot(self):
+        """Returns every metric as ``{name: {label values: value}}``.
+
+        Counters map to numbers, histograms to a dict of ``count``, ``sum``
+        and the cumulative ``buckets`` by upper bound, for example
+        ``snapshot()['requests_total'][('beer', 'POST', '200')]``.
+        """
+        snapshot = {}
+        with self._lock:
+            for name, values in self._values.items():
+                if _METRICS[name][0] == 'counter':
+                    snapshot[name] = dict(values)
+                    continue
+                snapshot[name] = {}
+                for labels, (counts, total) in values.items():
+                    cumulative = _cumulative(counts)
+                    snapshot[name][labels] = {
+                        'count': cumulative[-1],
+                        'sum': total,
+                        'buckets': dict(zip(self.buckets + (float('inf'),), cumulative)),
+                    }
+        return snapshot
+
+    def prometheus(self, prefix='ratebeer_'):
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        snapshot = self.snapshot()
+        for name in sorted(snapshot):
+            kind, help, label_names = _METRICS[name]
+            metric = prefix + name
+            lines.append('# HELP {0} {1}'.format(metric, help))
+            lines.append('# TYPE {0} {1}'.format(metric, kind))
+            for labels, value in sorted(snapshot[name].items()):
+                pairs = list(zip(label_names, labels))
+                if kind == 'counter':
+                    lines.append('{0}{1} {2}'.format(metric, _labels(pairs), value))
+                    continue
+                for bound in self.buckets + (float('inf'),):
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('{0}_bucket{1} {2}'.format(
+                        metric, _labels(pairs + [('le', le)]), value['buckets'][bound]))
+                lines.append('{0}_sum{1} {2!r}'.format(metric, _labels(pairs), value['sum']))
+                lines.append('{0}_count{1} {2}'.format(metric, _labels(pairs), value['count']))
+        return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def _timed(stats, name, *labels):
+    """Observes the time spent in the block, if ``stats`` is not None."""
+    if stats is None:
+        yield
+        return
+    start = _clock()
+    try:
+        yield
+    finally:
+        stats._observe(name, labels, _clock() - start)
+
+
+def _cumulative(counts):
+    total, cumulative = 0, []
+    for count in counts:
+        total += count
+        cumulative.append(total)
+    return cumulative
+
+
+def _labels(pairs):
+    return '{' + ','.join('{0}="{1}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                          for k, v in pairs) + '}'
@@ -0,0 +1,171 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Incremental refreshes of beers, driven by their rating counts::
+
+    >>> from ratebeer.sync import Sync
+    >>> sync = Sync('snapshot.db')
+    >>> for beer, new_reviews, error in sync.brewery(rb.get_brewery(url), reviews=True):
+    ...     save(beer, new_reviews)
+
+Only beers whose number of ratings changed since the last sync are fetched,
+and only the review pages holding the new ratings.
+"""
+
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+
+try:
+    import transport as transport_helper
+    from ratebeer import RateBeer
+except ImportError:  # No implicit package imports in py3.
+    from ratebeer import transport as transport_helper
+    from ratebeer.ratebeer import RateBeer
+
+
+class Sync(object):
+    """Keeps a snapshot of the rating count of every beer it has refreshed.
+
+    Args:
+        path (string): the SQLite file holding the snapshot. Created if it
+            doesn't exist.
+        rb (RateBeer): the client to fetch with. By default one is created
+            with a connection pool as large as ``workers``.
+        workers (int): the number of beers refreshed concurrently
+            (default: 4).
+    """
+
+    def __init__(self, path, rb=None, workers=None):
+        if workers is None:
+            workers = 4
+        if rb is None:
+            rb = RateBeer(transport_helper.Transport(pool_maxsize=workers))
+        self.rb = rb
+        self.workers = workers
+        self._db = sqlite3.connect(path)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS beers ("
+                             "id TEXT PRIMARY KEY, url TEXT, num_ratings INTEGER, "
+                             "synced REAL)")
+
+    def brewery(self, brewery, reviews=None):
+        """Refreshes the changed beers of a ``Brewery``. See ``refresh``."""
+        return self.refresh(brewery.get_beers(), reviews)
+
+    def style(self, ident, reviews=None):
+        """Refreshes the changed beers of a beer style. See ``refresh``."""
+        return self.refresh(self.rb.beer_style(ident), reviews)
+
+    def changed(self, beers):
+        """Returns ``(beer, count, previous count)`` for every beer whose
+        rating count differs from the snapshot, or that isn't in it.
+
+        Counts are read from the listing the beers came from. Beers listed
+        without one have just their counts fetched, many per request.
+        """
+        beers = list(beers)
+        counts = [beer.__dict__.get('num_ratings') for beer in beers]
+        missing = [i for i, count in enumerate(counts) if count is None]
+        if missing:
+            fetched = self.rb.get_beers([beers[i].url for i in missing], fields=['num_ratings'])
+            for i, (beer, error) in zip(missing, fetched):
+                if error is None:
+                    counts[i] = beer.num_ratings or 0
+        changed = []
+        for beer, count in zip(beers, counts):
+            row = self._db.execute("SELECT num_ratings FROM beers WHERE id = ?",
+                                   (_beer_id(beer),)).fetchone()
+            previous = row[0] if row else None
+            if count is None or count != previous:
+                changed.append((beer, count, previous))
+        return changed
+
+    def refresh(self, beers, reviews=None):
+        """Fetches the beers whose rating count changed since the last sync.
+
+        Args:
+            beers (iterable): ``Beer`` objects from a listing, such as
+                ``Brewery.get_beers`` or ``RateBeer.beer_style``.
+            reviews (bool): if True, also fetch the reviews added since the
+                last sync, newest first. A beer synced for the first time
+                gets all of its reviews (default: False).
+
+        Returns:
+            A generator of ``(beer, new reviews, error)`` tuples, in the order
+            they complete, for the changed beers only. ``error`` is None, or
+            the exception, such as ``PageNotFound`` or a network error, that
+            stopped the beer from being refreshed. A beer's snapshot is only
+            updated once it is refreshed, so failed beers are tried again
+            next time.
+        """
+        if reviews is None:
+            reviews = False
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        futures = {}
+        try:
+            for beer, count, previous in self.changed(beers):
+                future = executor.submit(self._refresh, beer, count, previous, reviews)
+                futures[future] = beer, count
+            for future in as_completed(futures):
+                beer, count = futures.pop(future)
+                try:
+                    new_reviews = future.result()
+                except Exception as e:
+                    yield beer, [], e
+                    continue
+                self._record(beer, count if count is not None else beer.num_ratings)
+                yield beer, new_reviews, None
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _refresh(self, beer, count, previous, reviews):
+        """Runs on a worker. Returns the beer's new reviews."""
+        beer._populate()
+        if not reviews:
+            return []
+        if count is None:
+            count = beer.num_ratings or 0
+        if previous is None:
+            return list(beer.get_reviews())
+        return list(islice(beer.get_reviews(), max(0, count - previous)))
+
+    def _record(self, beer, count):
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO beers VALUES (?, ?, ?, ?)",
+                             (_beer_id(beer), beer.url, count, time.time()))
+
+    def close(self):
+        self._db.close()
+
+
+def _beer_id(beer):
+    ident = beer.__dict__.get('id')
+    if ident is None:
+        ident = beer.url.split('/')[-2]
+    return str(ident)
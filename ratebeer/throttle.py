@@ -0,0 +1,164 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+"""Client-side rate limiting and retries for ``Transport`` and
+``AsyncTransport``::
+
+    >>> from ratebeer import RateBeer, Transport
+    >>> from ratebeer.throttle import Throttle
+    >>> rb = RateBeer(Transport(throttle=Throttle(rate=5, adaptive=True)))
+"""
+
+import email.utils
+import random
+import threading
+import time
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class Throttle(object):
+    """Paces and retries every request sent through a transport.
+
+    Requests take a token from a bucket refilled at ``rate`` per second, so a
+    client and all of its models, on any number of threads, stay under one
+    shared rate. Connection errors and responses with a status in
+    ``statuses`` are retried with jittered exponential backoff; a
+    ``Retry-After`` header pauses every request of the client for as long as
+    the server asks.
+
+    Args:
+        rate (float): sustained requests per second (default: None,
+            unlimited).
+        burst (int): requests that may be sent back to back before ``rate``
+            applies (default: 1).
+        retries (int): how often a request is retried (default: 3).
+        backoff (float): the base of the backoff in seconds; retry ``n``
+            waits a random time up to ``backoff * 2 ** n`` (default: 0.5).
+        max_backoff (float): the longest wait before a retry. A response
+            whose ``Retry-After`` asks for longer is returned instead of
+            retried (default: 30).
+        statuses (tuple): the response statuses that are retried (default:
+            429, 500, 502, 503 and 504).
+        adaptive (bool): if True, halve the rate whenever a request fails
+            with a retried status or connection error, and raise it again by
+            a hundredth of ``rate`` per success, so that throughput settles
+            at what the site will sustain. Requires ``rate`` (default: False).
+        min_rate (float): the floor of the adapted rate (default: a tenth of
+            ``rate``).
+    """
+
+    def __init__(self, rate=None, burst=None, retries=None, backoff=None,
+                 max_backoff=None, statuses=None, adaptive=None, min_rate=None):
+        if burst is None:
+            burst = 1
+        if retries is None:
+            retries = 3
+        if backoff is None:
+            backoff = 0.5
+        if max_backoff is None:
+            max_backoff = 30
+        if statuses is None:
+            statuses = (429, 500, 502, 503, 504)
+        if adaptive is None:
+            adaptive = False
+        if adaptive and rate is None:
+            raise ValueError("An adaptive throttle needs a starting rate.")
+        if min_rate is None and rate is not None:
+            min_rate = rate / 10.0
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.adaptive = adaptive
+        self._tokens = float(burst)
+        self._updated = _clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Takes a token and returns how many seconds to wait before
+        sending."""
+        with self._lock:
+            now = _clock()
+            wait = max(0.0, self._paused_until - now)
+            if self.rate is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+            return wait
+
+    def _retry_delay(self, attempt, status=None, headers=None):
+        """Returns how many seconds to wait before retrying a request, or
+        None if it should not be retried.
+
+        Args:
+            attempt (int): the number of retries made so far.
+            status (int): the response status, or None after a connection
+                error.
+            headers (dict): the response headers.
+        """
+        failed = status is None or status in self.statuses
+        self._adapt(failed)
+        if not failed or attempt >= self.retries:
+            return None
+        retry_after = _retry_after(headers)
+        if retry_after is None:
+            return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after > self.max_backoff:
+            return None
+        with self._lock:
+            # ``_reserve`` holds back every request until the pause is over.
+            self._paused_until = max(self._paused_until, _clock() + retry_after)
+        return 0.0
+
+    def _adapt(self, failed):
+        if not self.adaptive:
+            return
+        with self._lock:
+            if failed:
+                self.rate = max(self.min_rate, self.rate / 2.0)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 100.0)
+
+
+def _retry_after(headers):
+    """Returns the seconds asked for by a ``Retry-After`` header, if any."""
+    value = (headers or {}).get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        date = email.utils.parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, email.utils.mktime_tz(date) - time.time())
@@ -0,0 +1,401 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+
+import codecs
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import cache as cache_helper
+    import stats as stats_helper
+except ImportError:  # No implicit package imports in py3.
+    from ratebeer import cache as cache_helper
+    from ratebeer import stats as stats_helper
+
+_GRAPHQL_URL = "https://beta.ratebeer.com/v1/api/graphql/"
+_UTF8_META = '<meta http-equiv="Content-Type" content="text/html;" charset="utf-8">'
+
+# The number of parsed pages a transport with a cache keeps for reuse.
+_PARSED_SIZE = 8
+
+
+class Transport(object):
+    """Pooled HTTP transport shared by a client and the models it creates.
+
+    Wraps a ``requests.Session`` so that every request made through it reuses
+    keep-alive connections instead of paying a fresh TCP and TLS handshake.
+
+    Args:
+        pool_connections (int): the number of per-host connection pools to
+            keep around (default: 10).
+        pool_maxsize (int): the maximum number of connections kept alive per
+            host (default: 10).
+        pool_block (bool): if True, never open more than ``pool_maxsize``
+            connections to one host and wait for a free one instead
+            (default: False).
+        timeout (float or tuple): a ``requests`` timeout, either a single
+            number of seconds or a ``(connect, read)`` tuple (default: None,
+            wait forever).
+        headers (dict): extra headers sent with every request.
+        cache (BaseCache): where to keep page and GraphQL responses, such as
+            a ``ratebeer.cache.MemoryCache`` (default: None, no caching).
+            The soup of the last few pages read is kept too, so a page served
+            unchanged from the cache isn't parsed again.
+        parser (string): "soup" (default) to read every page with
+            BeautifulSoup, or "lxml" to read brewery pages, brewery beer
+            listings and the style list with the faster lxml extractors in
+            ``ratebeer.extract``.
+        throttle (Throttle): rate limit and retry policy for every request,
+            a ``ratebeer.throttle.Throttle`` (default: None, requests are
+            sent as they come and never retried).
+        stats (Stats): where to record request, cache, parse and populate
+            metrics, a ``ratebeer.stats.Stats`` (default: None, nothing is
+            measured).
+        coalesce (bool): if True, concurrent identical fetches share one
+            request: a thread asking for a page or GraphQL operation that
+            another thread is already fetching waits for that response, and
+            pages parsed with BeautifulSoup share one parse (default: False).
+    """
+
+    def __init__(self, pool_connections=None, pool_maxsize=None,
+                 pool_block=None, timeout=None, headers=None, cache=None,
+                 parser=None, throttle=None, stats=None, coalesce=None):
+        if pool_connections is None:
+            pool_connections = 10
+        if pool_maxsize is None:
+            pool_maxsize = 10
+        if pool_block is None:
+            pool_block = False
+        self.timeout = timeout
+        if parser is None:
+            parser = 'soup'
+        self.cache = cache
+        self.parser = parser
+        self.throttle = throttle
+        self.stats = stats
+        if coalesce is None:
+            coalesce = False
+        self.coalesce = coalesce
+        self._flights = _SingleFlight()
+        self._parsed = OrderedDict()
+        self._parsed_lock = threading.Lock()
+        self.identities = None
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get(self, url, **kwargs):
+        """Sends a GET request through the pool."""
+        return self._request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Sends a POST request through the pool."""
+        return self._request('POST', url, **kwargs)
+
+    def _request(self, method, url, endpoint=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if self.throttle is None:
+            return self._send(method, url, endpoint, **kwargs)
+        attempt = 0
+        while True:
+            time.sleep(self.throttle._reserve())
+            try:
+                req = self._send(method, url, endpoint, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                delay = self.throttle._retry_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                delay = self.throttle._retry_delay(attempt, req.status_code, req.headers)
+                if delay is None:
+                    return req
+                # Hand the connection back to the pool before waiting.
+                req.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, method, url, endpoint, **kwargs):
+        if self.stats is None:
+            return self.session.request(method, url, **kwargs)
+        if endpoint is None:
+            endpoint = cache_helper._endpoint(url)
+        start = stats_helper._clock()
+        try:
+            req = self.session.request(method, url, **kwargs)
+        except Exception:
+            self.stats._request(endpoint, method, 'error', stats_helper._clock() - start, 0)
+            raise
+        if kwargs.get('stream'):
+            # Reading the content would wait for the whole body.
+            size = int(req.headers.get('Content-Length') or 0)
+        else:
+            size = len(req.content)
+        self.stats._request(endpoint, method, req.status_code,
+                            stats_helper._clock() - start, size)
+        return req
+
+    def get_text(self, url):
+        """Returns the decoded body of a page, from the cache if possible.
+
+        Stale cached pages are revalidated with ``If-None-Match`` and
+        ``If-Modified-Since``, and reused if the server answers 304.
+        """
+        return self._coalesced(('GET', url), cache_helper._endpoint(url),
+                               self._get_text, url)
+
+    def _get_text(self, url):
+        if self.cache is None:
+            return _text(self.get(url, allow_redirects=True))
+
+        key = cache_helper._key('GET', url)
+        page = cache_helper._load_page(self.cache.get(key))
+        endpoint = cache_helper._endpoint(url)
+        if cache_helper._is_fresh(page):
+            self._count_cache(endpoint, 'hit')
+            return page['text']
+
+        req = self.get(url, allow_redirects=True,
+                       headers=cache_helper._conditional_headers(page))
+        if req.status_code == 304 and page is not None:
+            self._count_cache(endpoint, 'revalidated')
+            text = page['text']
+            etag = req.headers.get('ETag') or page.get('etag')
+            last_modified = req.headers.get('Last-Modified') or page.get('last_modified')
+        elif req.status_code == 200:
+            self._count_cache(endpoint, 'miss')
+            text = _text(req)
+            etag = req.headers.get('ETag')
+            last_modified = req.headers.get('Last-Modified')
+        else:
+            return _text(req)
+        cache_helper._store_page(self.cache, key, text, etag, last_modified, endpoint)
+        return text
+
+    def post_text(self, url, data=None, headers=None, endpoint=None):
+        """Returns the decoded body of a POST, from the cache if possible."""
+        endpoint = endpoint or cache_helper._endpoint(url)
+        key = cache_helper._key('POST', url, data)
+        return self._coalesced(key, endpoint, self._post_text, url, data, headers,
+                               endpoint, key)
+
+    def _post_text(self, url, data, headers, endpoint, key):
+        text = self._from_cache(key)
+        if text is None:
+            req = self.post(url, data=data, headers=headers, endpoint=endpoint)
+            text = _text(req)
+            self._to_cache(key, text, req, endpoint)
+            self._count_cache(endpoint, 'miss')
+        else:
+            self._count_cache(endpoint, 'hit')
+        return text
+
+    def post_chunks(self, url, data=None, headers=None, endpoint=None, chunk_size=None):
+        """Generator of the decoded body of a POST, piece by piece as it
+        arrives.
+
+        A cached body is yielded in one piece. Otherwise the response is
+        streamed, ``chunk_size`` bytes at a time (default: 16384), and cached
+        once it is complete.
+        """
+        if chunk_size is None:
+            chunk_size = 16384
+        endpoint = endpoint or cache_helper._endpoint(url)
+        key = cache_helper._key('POST', url, data)
+        text = self._from_cache(key)
+        if text is not None:
+            self._count_cache(endpoint, 'hit')
+            yield text
+            return
+
+        req = self.post(url, data=data, headers=headers, endpoint=endpoint, stream=True)
+        chunks = []
+        try:
+            decoder = None
+            for content in req.iter_content(chunk_size):
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder(_encoding(req, content))('replace')
+                chunk = decoder.decode(content)
+                if self.cache is not None:
+                    chunks.append(chunk)
+                yield chunk
+            if decoder is not None:
+                chunk = decoder.decode(b'', True)
+                if self.cache is not None:
+                    chunks.append(chunk)
+                yield chunk
+        finally:
+            req.close()
+        self._to_cache(key, u''.join(chunks), req, endpoint)
+        self._count_cache(endpoint, 'miss')
+
+    def graphql(self, operations):
+        """Sends one GraphQL operation, or a batched list of them, and returns
+        the response text."""
+        return self.post_text(_GRAPHQL_URL,
+                              data=json.dumps(operations),
+                              headers={"content-type": "application/json"},
+                              endpoint=_operation_name(operations))
+
+    def _coalesced(self, key, endpoint, func, *args):
+        """Returns ``func(*args)``, or with ``coalesce`` on, the result of
+        the call with the same ``key`` already in flight, if there is one."""
+        if not self.coalesce:
+            return func(*args)
+        result, shared = self._flights.do(key, func, *args)
+        if shared and self.stats is not None:
+            self.stats._inc('coalesced_total', (endpoint or 'other',))
+        return result
+
+    def _from_cache(self, key):
+        if self.cache is None:
+            return None
+        return self.cache.get(key)
+
+    def _to_cache(self, key, text, req, endpoint):
+        if self.cache is not None and req.status_code == 200:
+            self.cache.set(key, text, self.cache.ttl_for(endpoint))
+
+    def _count_cache(self, endpoint, result):
+        if self.stats is not None and self.cache is not None:
+            self.stats._cache(endpoint, result)
+
+    def _from_parsed(self, key):
+        """Returns the soup kept for ``key``, or None. Soup is shared, so it
+        is only ever read from."""
+        with self._parsed_lock:
+            soup = self._parsed.pop(key, None)
+            if soup is not None:
+                self._parsed[key] = soup
+            return soup
+
+    def _to_parsed(self, key, soup):
+        with self._parsed_lock:
+            self._parsed[key] = soup
+            while len(self._parsed) > _PARSED_SIZE:
+                self._parsed.popitem(last=False)
+
+    def close(self):
+        """Closes every pooled connection."""
+        with self._parsed_lock:
+            self._parsed.clear()
+        self.session.close()
+
+
+class _SingleFlight(object):
+    """Runs a function once for all the threads asking for the same key at
+    the same time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args):
+        """Returns ``(result, shared)``: the result of ``func(*args)``, or of
+        the call for ``key`` that was already running, and whether it was
+        that one. Its exception is raised in every waiting thread."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = func(*args)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class _Call(object):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _text(req):
+    if _UTF8_META in req.text:
+        req.encoding = 'utf-8'
+    return req.text
+
+
+def _encoding(req, content):
+    """Returns the encoding ``_text`` would decode a page with, judged from
+    its first ``content`` bytes."""
+    if _UTF8_META.encode('ascii') in content:
+        return 'utf-8'
+    return req.encoding or 'ISO-8859-1'
+
+
+def _decode(content, encoding=None):
+    """Decodes a raw page body the same way ``requests`` does for ``_text``."""
+    text = content.decode(encoding or 'ISO-8859-1', 'replace')
+    if _UTF8_META in text:
+        text = content.decode('utf-8', 'replace')
+    return text
+
+
+def _operation_name(operations):
+    if isinstance(operations, list):
+        operations = operations[0]
+    return operations.get('operationName')
+
+
+_default_transport = None
+
+
+def get_default():
+    """Returns the transport used by models created without a client."""
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = Transport()
+    return _default_transport
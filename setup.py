@@ -38,6 +38,11 @@ setup(
         "beautifulsoup4",
         "lxml",
         "requests[security]",
+        "futures; python_version < '3'",
     ],
+    extras_require={
+        "async": ["aiohttp"],
+        "export": ["pyarrow"],
+    },
     test_suite="test.py",
 )
\ No newline at end of file
@@ -1,9 +1,39 @@
 #!/usr/bin/env python
 # coding: utf-8
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
 import unittest
 
 from ratebeer import RateBeer
 from ratebeer import rb_exceptions
+from ratebeer import soup
+from ratebeer.cache import MemoryCache, SQLiteCache
+from ratebeer.crawl import Crawler
+from ratebeer.identity import IdentityMap
+from ratebeer.index import Index
+from ratebeer.match import Matcher, normalise, similarity
+from ratebeer.models import BeerListing
+from ratebeer.pipeline import Pipeline
+from ratebeer.stats import Stats
+from ratebeer.sync import Sync
+from ratebeer.throttle import Throttle
+from ratebeer.transport import Transport
+
+try:
+    import pyarrow.parquet
+    from ratebeer.export import write_beers
+except ImportError:
+    write_beers = None
+
+try:
+    import asyncio
+    from ratebeer.aio import AsyncRateBeer
+except (ImportError, SyntaxError):  # Python 2, or aiohttp isn't installed.
+    AsyncRateBeer = None
 
 
 class TestBeer(unittest.TestCase):
@@ -59,6 +89,14 @@ class TestBeer(unittest.TestCase):
         for i in range(20):
             self.assertIsNotNone(next(reviews))
 
+    def test_beer_get_reviews_prefetch(self):
+        ''' Prefetched review pages come back in the same order '''
+        beer = RateBeer().get_beer('/beer/deschutes-inversion-ipa/55610/')
+        reviews = beer.get_reviews()
+        prefetched = beer.get_reviews(prefetch=3)
+        for i in range(30):
+            self.assertTrue(next(reviews).text == next(prefetched).text)
+
     def test_beer_get_reviews_404(self):
         ''' Check lazy get_reviews 404 exception '''
         beer = RateBeer().get_beer('/beer/asdfasdf')
@@ -104,6 +142,96 @@ class TestBeer(unittest.TestCase):
         results = RateBeer().beer('/beer/shorts-funkin-punkin/79468/')
         self.assertTrue(results['retired'] == True)
 
+    def test_get_beers_batch(self):
+        ''' Batched beer fetches report per-beer errors without failing the batch '''
+        results = list(RateBeer().get_beers([
+            '/beer/new-belgium-tour-de-fall/279122/',
+            '/beer/new-belgium-biere-de-mars/113241/',
+            157144,
+        ], batch_size=2))
+        self.assertTrue(len(results) == 3)
+        self.assertTrue(results[0][1] is None)
+        self.assertTrue(results[0][0].name == u'New Belgium Tour de Fall')
+        self.assertTrue(isinstance(results[1][1], rb_exceptions.AliasedBeer))
+        self.assertTrue(results[2][1] is None)
+        self.assertTrue(results[2][0].brewery.url == u'/brewers/klosterbrauerei-ettal/1943/')
+
+    def test_beer_fields_complete(self):
+        ''' A selective beer counts as fetched once every group is in, and pickles its fields '''
+        info = {'name': u'Canned', 'brewer': {'id': 1, 'name': u'Brewer'},
+                'overallScore': 90, 'styleScore': 80, 'style': {'id': 2, 'name': u'IPA'},
+                'ratingCount': 10, 'averageRating': 3.5, 'seasonal': 'UNKNOWN', 'ibu': 40,
+                'calories': 150, 'abv': 6.0, 'isRetired': False, 'description': u'Hoppy'}
+
+        class CannedTransport(Transport):
+            def graphql(self, operations):
+                return json.dumps([{'data': {'info': info}},
+                                   {'data': {'tagDisplayArr': {'items': []}}}][:len(operations)])
+
+        beer = RateBeer(CannedTransport()).get_beer('/beer/canned/1/', True, fields=['abv'])
+        copied = pickle.loads(pickle.dumps(beer))
+        self.assertTrue(copied._fields == ('abv',))
+        self.assertTrue('_fields' not in copied.__dict__)
+        self.assertFalse(beer._has_fetched)
+        beer.brewery, beer.mean_rating, beer.style, beer.description
+        self.assertFalse(beer._has_fetched)
+        beer.tags
+        self.assertTrue(beer._has_fetched)
+
+    def test_beer_fields_reviews(self):
+        ''' Reviews of a selective beer don't fetch it, and a shared beer gains new fields '''
+        class CannedTransport(Transport):
+            def graphql(self, operations):
+                calls.append(operations)
+                return json.dumps([{'data': {'info': {'name': u'Canned', 'abv': 5.0}}}])
+
+            def get_text(self, url):
+                return u'<div class="reviews-container"></div>'
+
+        calls = []
+        rb = RateBeer(CannedTransport(), identity_map=True)
+        beer = rb.get_beer('/beer/canned/1/', fields=['abv'])
+        self.assertListEqual(list(beer.get_reviews()), [])
+        self.assertListEqual(calls, [])
+        self.assertTrue(rb.get_beer('/beer/canned/1/', fields=['ibu']) is beer)
+        self.assertTrue(beer._fields == ('abv', 'ibu'))
+        rb.get_beer('/beer/canned/1/')
+        self.assertIsNone(getattr(beer, '_fields', None))
+
+    def test_get_beers_malformed_response(self):
+        ''' GraphQL errors fail only the beers they belong to '''
+        class CannedTransport(Transport):
+            def graphql(self, operations):
+                return json.dumps(self.responses.pop(0))
+
+        transport = CannedTransport()
+        transport.responses = [
+            [{'data': {'info': {'name': u'Good', 'abv': 5.0}}},
+             {'data': None},
+             {'data': {'info': None}}],
+            {'errors': [{'message': 'Internal server error'}]},
+        ]
+        results = list(RateBeer(transport).get_beers([1, 2, 3, 4, 5], batch_size=3,
+                                                     fields=['abv']))
+        self.assertTrue(results[0][1] is None and results[0][0].abv == 5.0)
+        self.assertIsInstance(results[1][1], rb_exceptions.JSONParseException)
+        self.assertIsInstance(results[2][1], rb_exceptions.PageNotFound)
+        self.assertTrue(all(isinstance(error, rb_exceptions.JSONParseException)
+                            for _, error in results[3:]))
+
+    def test_beer_fields(self):
+        ''' Selective beers only fetch what was asked for, then a group at a time '''
+        beer = RateBeer().get_beer('/beer/new-belgium-tour-de-fall/279122/', True,
+                                   fields=['abv', 'overall_rating'])
+        self.assertTrue(len(beer._operations()) == 1)
+        self.assertTrue('description' not in beer._operations()[0]['query'])
+        self.assertTrue(beer.abv == 6.0)
+        self.assertTrue('style' not in beer.__dict__)
+        self.assertTrue(beer.style == u'American Pale Ale')
+        self.assertTrue('description' not in beer.__dict__)
+        with self.assertRaises(ValueError):
+            RateBeer().get_beer('/beer/new-belgium-tour-de-fall/279122/', fields=['colour'])
+
     def test_beer_aliased(self):
         ''' Check that AliasedBeer exception is raised properly'''
         rb = RateBeer()
@@ -130,12 +258,37 @@ class TestBrewery(unittest.TestCase):
         for beer in beers:
             self.assertIsNotNone(beer)
 
+    def test_brewery_get_beers_listing(self):
+        ''' Listing rows are complete records that never fetch on their own '''
+        rb = RateBeer(Transport(stats=Stats()))
+        brewery = rb.get_brewery("/brewers/deschutes-brewery/233/")
+        listings = list(brewery.get_beers(listing=True))
+        self.assertTrue(all(set(l.__dict__) == set(BeerListing._listed) for l in listings))
+        with self.assertRaises(AttributeError):
+            listings[0].description
+        self.assertTrue(sum(rb.stats.snapshot()['requests_total'].values()) == 1)
+        beer = listings[0].hydrate()
+        self.assertTrue(beer._has_fetched and beer.url == listings[0].url)
+
     def test_brewery_get_beers_404(self):
         ''' Check lazy get_beer 404 exception '''
         brewery = RateBeer().get_brewery("/brewers/qwerty/1234567890")
         with self.assertRaises(rb_exceptions.PageNotFound):
             next(brewery.get_beers())
 
+    def test_brewery_lxml_parser(self):
+        ''' The lxml extractors agree with the BeautifulSoup parsers '''
+        url = "/brewers/deschutes-brewery/233/"
+        soup_rb = RateBeer(Transport(parser='soup'))
+        lxml_rb = RateBeer(Transport(parser='lxml'))
+        for attr in ['name', 'type', 'web', 'street', 'city', 'country']:
+            self.assertTrue(getattr(soup_rb.get_brewery(url, True), attr) ==
+                            getattr(lxml_rb.get_brewery(url, True), attr))
+        soup_beers = [b.url for b in soup_rb.get_brewery(url).get_beers()]
+        lxml_beers = [b.url for b in lxml_rb.get_brewery(url).get_beers()]
+        self.assertListEqual(soup_beers, lxml_beers)
+        self.assertTrue(soup_rb.beer_style_list() == lxml_rb.beer_style_list())
+
     def test_brewery_unicode(self):
         ''' Check unicode brewery URLs '''
         results = RateBeer().brewery("/brewers/brauhaus-18•80/12750/")
@@ -159,6 +312,41 @@ class TestMisc(unittest.TestCase):
         self.assertIsNotNone(beers)
         self.assertTrue(beers[0].name == u'Busch NA')
 
+    def test_crawl_styles(self):
+        ''' Every listing of a style is fetched, each beer yielded once with its ranks '''
+        rb = RateBeer()
+        ident = rb.beer_style_list()['Abt/Quadrupel']
+        beers = list(rb.crawl_styles([ident], workers=3))
+        self.assertTrue(len(beers) == len(set(beer.url for beer in beers)))
+        self.assertTrue(all(beer.style_id == ident for beer in beers))
+        top = [beer for beer in beers if beer.style_ranks.get(('score', 'descending')) == 1]
+        self.assertTrue(top[0].name == u'Westvleteren 12 (XII)')
+
+    def test_hydrate(self):
+        ''' A mixed collection of lazy models is fetched, in order if asked '''
+        rb = RateBeer()
+        models = [rb.get_beer('/beer/new-belgium-tour-de-fall/279122/'),
+                  rb.get_brewery('/brewers/deschutes-brewery/233/'),
+                  rb.get_brewery('/brewers/qwerty/1234567890'),
+                  rb.get_beer('/beer/deschutes-inversion-ipa/55610/')]
+        results = list(rb.hydrate(models, concurrency=2, ordered=True))
+        self.assertTrue([model for model, _ in results] == models)
+        self.assertIsInstance(results[2][1], rb_exceptions.PageNotFound)
+        self.assertTrue(all(model._has_fetched for model, error in results if error is None))
+        self.assertTrue(results[1][0].name == u'Deschutes Brewery')
+
+    def test_model_attributes(self):
+        ''' Custom attributes and pickling survive the slots-based models '''
+        beer = RateBeer().get_beer('/beer/deschutes-inversion-ipa/55610/')
+        beer.name = u'Deschutes Inversion IPA'
+        beer.shelf = 3
+        self.assertTrue(beer.__dict__['shelf'] == 3)
+        self.assertTrue('_transport' not in beer.__dict__)
+        copied = pickle.loads(pickle.dumps(beer))
+        self.assertTrue(copied.name == u'Deschutes Inversion IPA')
+        self.assertTrue(copied.shelf == 3)
+        self.assertTrue(copied._has_fetched == False)
+
     def test_whitespace_in_url(self):
         ''' The rare situation where a URL might have whitespace '''
         results = RateBeer().search("13 Virtues Cleanliness Helles")
@@ -205,6 +393,172 @@ class TestSearch(unittest.TestCase):
         self.assertTrue(beer.url == u'/beer/to-øl-jule-mælk/235066/')
         self.assertTrue(beer.name == u'To Øl Jule Mælk')
 
+    def test_iter_search_pages(self):
+        ''' Streaming search follows the cursor past the first page '''
+        beers = list(RateBeer().iter_search('ipa', page_size=10, max_results=35))
+        self.assertTrue(len(beers) == 35)
+        self.assertTrue(len(set(beer.id for beer in beers)) == 35)
+
+
+class TestSync(unittest.TestCase):
+    def test_incremental_refresh(self):
+        ''' Beers are only refreshed again once their rating count changes '''
+        sync = Sync(os.path.join(tempfile.mkdtemp(), 'sync.db'))
+        brewery = RateBeer().get_brewery('/brewers/deschutes-brewery/233/')
+
+        def listing():
+            return list(brewery.get_beers())[:3]
+
+        refreshed = list(sync.refresh(listing()))
+        self.assertTrue(len(refreshed) == 3)
+        self.assertTrue(all(beer._has_fetched and error is None for beer, _, error in refreshed))
+        self.assertListEqual(list(sync.refresh(listing())), [])
+        beers = listing()
+        beers[0].num_ratings += 1
+        self.assertListEqual([beer for beer, _, _ in sync.refresh(beers)], [beers[0]])
+
+    def test_refresh_errors(self):
+        ''' Any error is reported per beer, and failed beers are tried again '''
+        class CannedTransport(Transport):
+            def graphql(self, operations):
+                if self.down:
+                    raise IOError('Connection reset')
+                info = {'name': u'Canned', 'brewer': {'id': 1, 'name': u'Brewer'},
+                        'overallScore': 90, 'styleScore': 80, 'style': {'id': 2, 'name': u'IPA'},
+                        'ratingCount': 1, 'averageRating': 3.5, 'seasonal': 'UNKNOWN',
+                        'ibu': 40, 'calories': 150, 'abv': 6.0, 'isRetired': False,
+                        'description': u'Hoppy'}
+                return json.dumps([{'data': {'info': info}}, {'data': {'beerByAlias': None}},
+                                   {'data': {'tagDisplayArr': {'items': []}}}])
+
+        transport = CannedTransport()
+        transport.down = True
+        rb = RateBeer(transport)
+        sync = Sync(':memory:', rb)
+
+        def listing():
+            beer = rb.get_beer('/beer/canned/1/')
+            beer.num_ratings = 1
+            return [beer]
+
+        refreshed = list(sync.refresh(listing()))
+        self.assertTrue(isinstance(refreshed[0][2], IOError))
+        transport.down = False
+        self.assertTrue(list(sync.refresh(listing()))[0][2] is None)
+        self.assertListEqual(list(sync.refresh(listing())), [])
+
+
+class TestIndex(unittest.TestCase):
+    def test_offline_index(self):
+        ''' Beers fetched once are answered from the index afterwards '''
+        path = os.path.join(tempfile.mkdtemp(), 'index.db')
+        rb = RateBeer(offline_index=path)
+        beer = rb.get_beer('/beer/new-belgium-tour-de-fall/279122/', True)
+        stored = RateBeer(Transport(timeout=0.001), offline_index=path).get_beer(
+            '/beer/new-belgium-tour-de-fall/279122/', True)
+        self.assertTrue(stored._has_fetched)
+        self.assertTrue(stored.abv == beer.abv)
+        self.assertTrue(stored.brewery.url == beer.brewery.url)
+        self.assertTrue(rb.search(u'tour de fall', offline=True)['beers'][0].url == beer.url)
+        self.assertTrue(len(rb.offline_index.find(style=beer.style, min_abv=5)) == 1)
+
+    def test_partial_beers(self):
+        ''' Listing data is stored without fetching, and never returned as complete '''
+        index = Index(':memory:')
+        beer = RateBeer().get_beer('/beer/beer-1/1/')
+        beer.name = u'Beer One'
+        beer.abv = 5.0
+        index.add(beer)
+        self.assertFalse(beer._has_fetched)
+        self.assertIsNone(index.get_beer('/beer/beer-1/1/'))
+        self.assertTrue(index.find(min_abv=4)[0].name == u'Beer One')
+
+    def test_brewery_search_by_name(self):
+        ''' Every word of a search must be in a brewery's name '''
+        index = Index(':memory:')
+        if not index.full_text:
+            self.skipTest("requires SQLite FTS5")
+        for url, name, city in [('/brewers/bend-brewing/1/', u'Bend Brewing', u'Portland'),
+                                ('/brewers/portland-brewing/2/', u'Portland Brewing', u'Bend')]:
+            brewery = RateBeer().get_brewery(url)
+            brewery.name = name
+            brewery.city = city
+            index.add(brewery)
+        found = index.search(u'brewing portland')['breweries']
+        self.assertListEqual([brewery.name for brewery in found], [u'Portland Brewing'])
+
+    def test_beers_without_id(self):
+        ''' Beers whose URL has no id are not stored under a made-up key '''
+        index = Index(':memory:')
+        beer = RateBeer().get_beer('/beer/no-id/')
+        beer.name = u'No Id'
+        index.add(beer)
+        self.assertTrue(len(index) == 0)
+        self.assertIsNone(index.get_beer('/beer/no-id/'))
+
+    def test_shared_objects(self):
+        ''' Beers and breweries read from the index go through the identity map '''
+        rb = RateBeer(identity_map=True)
+        index = Index(':memory:')
+        beer = rb.get_beer('/beer/beer-1/1/')
+        beer.name = u'Beer One'
+        beer.brewery = rb.get_brewery('/brewers/brewery-2/2/')
+        index.add(beer)
+        found = index.find(transport=rb.transport)[0]
+        self.assertTrue(found is beer)
+        self.assertTrue(found.brewery is beer.brewery)
+
+    def test_shared_objects_kept(self):
+        ''' Reading a partial row never unloads or overwrites a shared object '''
+        index = Index(':memory:')
+        stored = RateBeer().get_beer('/beer/beer-1/1/')
+        stored.name = u'Old Name'
+        stored.abv = 4.0
+        stored.brewery = RateBeer().get_brewery('/brewers/brewery-2/2/')
+        stored.brewery.name = u'Old Brewery'
+        index.add(stored)
+
+        rb = RateBeer(identity_map=True)
+        brewery = rb.get_brewery('/brewers/brewery-2/2/')
+        brewery.name = u'Brewery'
+        brewery.city = u'Bend'
+        brewery._has_fetched = True
+        beer = rb.get_beer('/beer/beer-1/1/')
+        beer.name = u'Beer One'
+        beer.brewery = brewery
+        beer.abv = 5.0
+        beer._has_fetched = True
+
+        found = index.find(transport=rb.transport)[0]
+        self.assertTrue(found is beer and found.brewery is brewery)
+        self.assertTrue(beer._has_fetched and brewery._has_fetched)
+        self.assertTrue(beer.name == u'Beer One' and beer.abv == 5.0)
+        self.assertTrue(brewery.name == u'Brewery' and brewery.city == u'Bend')
+        if index.full_text:
+            self.assertTrue(index.search(u'old brewery', transport=rb.transport)['breweries'][0]
+                            is brewery)
+            self.assertTrue(brewery._has_fetched and brewery.name == u'Brewery')
+
+
+class TestMatch(unittest.TestCase):
+    def test_normalise(self):
+        ''' Names are compared without case, accents, punctuation or filler words '''
+        self.assertTrue(normalise(u'Summit Brewing Co.') == u'summit')
+        self.assertTrue(normalise(u'To Øl Jule Mælk') == u'to øl jule mælk')
+        self.assertTrue(similarity(u'Summit Brewing Co. Extra Pale Ale', u'Summit Extra Pale Ale') == 1)
+        self.assertTrue(similarity(u'Deschutes Inversion', u'Sierra Nevada Torpedo') < 0.5)
+
+    def test_match(self):
+        ''' Duplicate queries are searched once and ranked best first '''
+        matcher = Matcher(workers=2, limit=5)
+        pairs = [(u'Summit Brewing Company', u'Extra Pale Ale'), (u'summit', u'extra pale ale')]
+        results = list(matcher.match(pairs))
+        self.assertTrue(len(results) == 2)
+        matches, error = results[0]
+        self.assertIsNone(error)
+        self.assertTrue(matches[0][0].url == u'/beer/summit-extra-pale-ale/7344/')
+        self.assertTrue(len(matcher.cache) == 1)
+
 
 class TestAlpha(unittest.TestCase):
     def test_fetch_by_letter(self):
@@ -215,6 +569,315 @@ class TestAlpha(unittest.TestCase):
         self.assertTrue(beer.url == u'/brewers/a-duus-and-co/1668/')
         self.assertTrue(beer.name == u'A. Duus & Co.')
 
+    def test_stream_by_letter(self):
+        ''' The streaming parser finds the same breweries as the full one '''
+        rb = RateBeer()
+        expected = [brewery.url for brewery in rb.brewers_by_alpha("Q")]
+        self.assertTrue([b.url for b in rb.iter_brewers_by_alpha("Q")] == expected)
+        streamed = [b.url for b in rb.all_brewers(["Q", "X"], workers=2)]
+        self.assertTrue(len(streamed) > len(expected))
+        self.assertTrue(set(expected) <= set(streamed))
+
+
+class TestTransport(unittest.TestCase):
+    def test_models_share_client_transport(self):
+        ''' Beers and breweries reuse the pooled transport of their client '''
+        transport = Transport(pool_maxsize=2, timeout=30)
+        rb = RateBeer(transport)
+        self.assertTrue(rb.get_beer('/beer/deschutes-inversion-ipa/55610/')._transport is transport)
+        self.assertTrue(rb.get_brewery('/brewers/deschutes-brewery/233/')._transport is transport)
+
+    def test_beer_brewery_transport(self):
+        ''' A fetched beer's brewery inherits the beer's transport '''
+        rb = RateBeer()
+        beer = rb.get_beer('/beer/new-belgium-tour-de-fall/279122/', True)
+        self.assertTrue(beer.brewery._transport is rb.transport)
+
+    def test_identity_map(self):
+        ''' With an identity map, beers and breweries are shared objects '''
+        rb = RateBeer(identity_map=True)
+        brewery = rb.get_brewery('/brewers/deschutes-brewery/233/', True)
+        beer = next(brewery.get_beers())
+        self.assertTrue(rb.get_beer(beer.url) is beer)
+        self.assertTrue(beer.brewery is brewery)
+        self.assertTrue(brewery._has_fetched)
+        self.assertFalse(RateBeer().get_beer(beer.url) is beer)
+
+    def test_identity_map_create(self):
+        ''' Objects are created outside the lock, and the first one stored wins '''
+        class Model(object):
+            url = None
+
+        identities = IdentityMap()
+        stored = Model()
+
+        def create():
+            # Like a Beer making its Brewery, while another thread stores the beer.
+            identities.get(Model, '/brewers/brewery/2/', create=Model)
+            identities.get(Model, '/beer/beer/1/', create=lambda: stored)
+            return Model()
+
+        self.assertTrue(identities.get(Model, '/beer/beer/1/', create=create) is stored)
+        self.assertTrue(stored.url == '/beer/beer/1/')
+
+    def test_coalesce(self):
+        ''' Concurrent identical fetches share the one already in flight '''
+        transport = Transport(coalesce=True, stats=Stats())
+        started, release, calls, results = threading.Event(), threading.Event(), [], []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'page'
+
+        def fetch_page():
+            results.append(transport._coalesced('key', 'beer', fetch))
+
+        threads = [threading.Thread(target=fetch_page) for _ in range(4)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(len(calls) == 1)
+        self.assertTrue(results == ['page'] * 4)
+        self.assertTrue(transport.stats.snapshot()['coalesced_total'] == {('beer',): 3})
+
+
+class TestThrottle(unittest.TestCase):
+    def test_token_bucket(self):
+        ''' Requests beyond the burst are spaced out at the configured rate '''
+        throttle = Throttle(rate=10, burst=2)
+        waits = [throttle._reserve() for _ in range(4)]
+        self.assertListEqual([w > 0 for w in waits], [False, False, True, True])
+        self.assertAlmostEqual(waits[3], 0.2, places=1)
+
+    def test_retry_delay(self):
+        ''' Retried statuses back off, Retry-After pauses every request '''
+        throttle = Throttle(retries=2, backoff=1)
+        self.assertIsNone(throttle._retry_delay(0, 404))
+        self.assertTrue(0 <= throttle._retry_delay(1, 503) <= 2)
+        self.assertIsNone(throttle._retry_delay(2, 503))
+        self.assertTrue(throttle._retry_delay(0, 429, {'Retry-After': '2'}) == 0)
+        self.assertTrue(1.5 < throttle._reserve() <= 2)
+        self.assertIsNone(throttle._retry_delay(0, 429, {'Retry-After': '3600'}))
+
+    def test_retry_closes_response(self):
+        ''' A response that is retried hands its connection back first '''
+        class Response(object):
+            headers = {}
+
+            def __init__(self, status_code):
+                self.status_code = status_code
+                self.closed = False
+
+            def close(self):
+                self.closed = True
+
+        responses = [Response(503), Response(200)]
+        sent = iter(responses)
+
+        class CannedTransport(Transport):
+            def _send(self, method, url, endpoint, **kwargs):
+                return next(sent)
+
+        transport = CannedTransport(throttle=Throttle(retries=2, backoff=0))
+        self.assertTrue(transport.post('http://example.com/', stream=True) is responses[1])
+        self.assertTrue(responses[0].closed and not responses[1].closed)
+
+    def test_adaptive(self):
+        ''' The rate halves on errors and recovers on successes '''
+        throttle = Throttle(rate=10, adaptive=True)
+        throttle._retry_delay(0, 429)
+        self.assertTrue(throttle.rate == 5)
+        for _ in range(100):
+            throttle._retry_delay(0, 200)
+        self.assertTrue(throttle.rate == 10)
+
+
+class TestStats(unittest.TestCase):
+    def test_histogram(self):
+        ''' Observations land in cumulative buckets and the text dump '''
+        events = []
+        stats = Stats(callbacks=[events.append], buckets=(0.1, 1))
+        stats._request('beer', 'POST', 200, 0.05, 100)
+        stats._request('beer', 'POST', 200, 0.5, 200)
+        histogram = stats.snapshot()['request_seconds'][('beer',)]
+        self.assertTrue(histogram['count'] == 2)
+        self.assertTrue(histogram['buckets'][0.1] == 1)
+        self.assertTrue(histogram['buckets'][float('inf')] == 2)
+        self.assertTrue(stats.snapshot()['response_bytes_total'][('beer',)] == 300)
+        self.assertTrue(len(events) == 6)
+        text = stats.prometheus()
+        self.assertTrue('ratebeer_request_seconds_bucket{endpoint="beer",le="1"} 2' in text)
+        self.assertTrue('ratebeer_requests_total{endpoint="beer",method="POST",status="200"} 2' in text)
+
+    def test_client_stats(self):
+        ''' Fetching a beer records its request and populate time '''
+        rb = RateBeer(Transport(stats=Stats()))
+        rb.get_beer('/beer/deschutes-inversion-ipa/55610/', True)
+        snapshot = rb.stats.snapshot()
+        self.assertTrue(snapshot['requests_total'][('beer', 'POST', '200')] == 1)
+        self.assertTrue(snapshot['populate_seconds'][('beer',)]['count'] == 1)
+
+
+class TestCache(unittest.TestCase):
+    def check_cache(self, cache):
+        cache.set('a', u'Brugghús Steðja', cache.ttl_for('beer'))
+        cache.set('b', u'2', cache.ttl_for('beer'))
+        self.assertTrue(cache.get('a') == u'Brugghús Steðja')
+        cache.set('c', u'3', cache.ttl_for('beer'))  # 'b' is least recently used
+        self.assertTrue(cache.get('b') is None)
+        self.assertTrue(cache.get('c') == u'3')
+        cache.set('d', u'4', 0.01)
+        time.sleep(0.02)
+        self.assertTrue(cache.get('d') is None)
+        cache.clear()
+        self.assertTrue(cache.get('a') is None)
+
+    def test_memory_cache(self):
+        ''' In-memory LRU eviction and expiry '''
+        self.check_cache(MemoryCache(maxsize=2))
+
+    def test_sqlite_cache(self):
+        ''' On-disk LRU eviction and expiry '''
+        path = os.path.join(tempfile.mkdtemp(), 'ratebeer.db')
+        cache = SQLiteCache(path, maxsize=2)
+        try:
+            self.check_cache(cache)
+        finally:
+            cache.close()
+
+    def test_endpoint_ttls(self):
+        ''' The style list is kept longer than everything else '''
+        cache = MemoryCache(ttl=60, ttls={'beer': 5})
+        self.assertTrue(cache.ttl_for('styles') > cache.ttl_for('brewery') == 60)
+        self.assertTrue(cache.ttl_for('beer') == 5)
+
+    def test_cached_beer(self):
+        ''' A cached beer is parsed from the cached response '''
+        cache = MemoryCache()
+        first = RateBeer(Transport(cache=cache)).beer('/beer/new-belgium-tour-de-fall/279122/')
+        self.assertTrue(len(cache) == 1)
+        second = RateBeer(Transport(cache=cache)).beer('/beer/new-belgium-tour-de-fall/279122/')
+        self.assertTrue(first['num_ratings'] == second['num_ratings'])
+
+    def test_parsed_per_transport(self):
+        ''' Unchanged cached pages are parsed once per transport '''
+        class CannedTransport(Transport):
+            def get_text(self, url):
+                return u'<html><body><h1>Page</h1></body></html>'
+
+        transport = CannedTransport(cache=MemoryCache())
+        first = soup._get_soup('/page/', transport)
+        self.assertTrue(soup._get_soup('/page/', transport) is first)
+        self.assertFalse(soup._get_soup('/page/', CannedTransport(cache=MemoryCache())) is first)
+        self.assertFalse(soup._get_soup('/page/', CannedTransport()) is first)
+
+    def test_revalidated_brewery(self):
+        ''' A stale cached brewery page is revalidated and reused '''
+        rb = RateBeer(Transport(cache=MemoryCache(ttl=0), stats=Stats()))
+        first = rb.brewery("/brewers/deschutes-brewery/233/")
+        self.assertFalse(('brewery', 'revalidated') in rb.stats.snapshot()['cache_total'])
+        second = rb.brewery("/brewers/deschutes-brewery/233/")
+        self.assertTrue(rb.stats.snapshot()['cache_total'][('brewery', 'revalidated')] > 0)
+        self.assertTrue(first['name'] == second['name'] == u'Deschutes Brewery')
+
+
+class TestCrawl(unittest.TestCase):
+    def test_crawl_resumes(self):
+        ''' An interrupted crawl resumes without refetching finished pages '''
+        path = os.path.join(tempfile.mkdtemp(), 'crawl.db')
+        crawler = Crawler(path, workers=2, letters=['Q'])
+        first = [item.url for _, item in zip(range(3), crawler.crawl())]
+        crawler.close()
+        crawler = Crawler(path, workers=2, letters=['Q'])
+        second = [item.url for _, item in zip(range(3), crawler.crawl())]
+        self.assertTrue(crawler.stats()['letter'] == {'done': 1})
+        # Only the item in hand when the first crawl stopped is seen again.
+        self.assertTrue(len(set(first) & set(second)) <= 1)
+
+
+class TestPipeline(unittest.TestCase):
+    def test_pipeline_matches_lazy_parsing(self):
+        ''' Parsing in worker processes gives the same objects as parsing in place '''
+        rb = RateBeer()
+        url = "/brewers/deschutes-brewery/233/"
+        with Pipeline(rb, fetchers=2, processes=2) as pipeline:
+            results = list(pipeline.brewery_beers([url, "/brewers/qwerty/1234567890"]))
+            brewery, beers, error = results[0]
+            self.assertIsNone(error)
+            self.assertTrue(brewery.__dict__ == rb.brewery(url))
+            expected = list(rb.get_brewery(url).get_beers())
+            self.assertTrue([b.__dict__ for b in beers] == [b.__dict__ for b in expected])
+            self.assertIsInstance(results[1][2], rb_exceptions.PageNotFound)
+
+            beer = rb.get_beer("/beer/new-belgium-tour-de-fall/279122/")
+            reviews = [r.__dict__ for _, r in zip(range(20), pipeline.reviews(beer))]
+            expected = [r.__dict__ for _, r in zip(range(20), beer.get_reviews())]
+            self.assertTrue(reviews == expected)
+
+
+@unittest.skipIf(write_beers is None, "requires pyarrow")
+class TestExport(unittest.TestCase):
+    def test_write_beers(self):
+        ''' Listing data is exported without fetching the missing attributes '''
+        rb = RateBeer()
+        beers = []
+        for i in range(5):
+            beer = rb.get_beer('/beer/beer-{0}/{0}/'.format(i + 1))
+            beer.name = u'Beer {0}'.format(i)
+            beer.abv = 5 + i
+            beers.append(beer)
+        path = os.path.join(tempfile.mkdtemp(), 'beers.parquet')
+        self.assertTrue(write_beers(beers, path, batch_size=2) == 5)
+        table = pyarrow.parquet.read_table(path)
+        self.assertListEqual(table.column('id').to_pylist(), [1, 2, 3, 4, 5])
+        self.assertListEqual(table.column('abv').to_pylist(), [5.0, 6.0, 7.0, 8.0, 9.0])
+        self.assertTrue(table.column('num_ratings').null_count == 5)
+        self.assertTrue(all(not beer._has_fetched for beer in beers))
+
+
+@unittest.skipIf(AsyncRateBeer is None, "requires Python 3 and aiohttp")
+class TestAsync(unittest.TestCase):
+    def run_async(self, coro):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+    def test_async_beers(self):
+        ''' Concurrent beer lookups return the same data as the blocking client '''
+        async def fetch():
+            async with AsyncRateBeer(concurrency=2) as rb:
+                return await asyncio.gather(
+                    rb.beer('/beer/new-belgium-tour-de-fall/279122/'),
+                    rb.beer('/beer/deschutes-altitude-amber/92102/'))
+        tour_de_fall, altitude = self.run_async(fetch())
+        self.assertTrue(tour_de_fall['name'] == u'New Belgium Tour de Fall')
+        self.assertTrue(altitude['name'] == u'Deschutes Altitude Amber')
+
+    def test_async_brewery_get_beers(self):
+        ''' Async brewery beer listings '''
+        async def fetch():
+            async with AsyncRateBeer() as rb:
+                brewery = await rb.get_brewery("/brewers/deschutes-brewery/233/")
+                return [beer async for beer in brewery.get_beers()]
+        beers = self.run_async(fetch())
+        self.assertTrue(len(beers) > 0)
+
+    def test_async_beer_404(self):
+        ''' Async beer lookups raise PageNotFound '''
+        async def fetch():
+            async with AsyncRateBeer() as rb:
+                return await rb.beer("/beer/asdfasdf")
+        self.assertRaises(rb_exceptions.PageNotFound, self.run_async, fetch())
+
 
 if __name__ == '__main__':
     unittest.main()